@@ -0,0 +1,298 @@
+"""
+Agregados materializados para as consultas do dashboard
+
+Cada cubo conta registros por um conjunto de dimensões (ex.: partido x UF x
+região) e é mantido de forma incremental a partir dos deltas de cada execução:
+as contribuições antigas das chaves alteradas são subtraídas e as novas,
+somadas. A base do cubo (contagem por chave e dimensões) fica na camada
+state, particionada por faixas de chave, e permite reconstruir a tabela
+agregada, gravada em final/agregados. Uma atualização lê e regrava apenas as
+partições das chaves do delta (ids novos ficam nas últimas faixas), além da
+tabela agregada; um manifesto JSON registra a versão de cada partição e o
+hash da tabela gravada.
+"""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Valor das dimensões nulas (ex.: deputado sem partido, data ausente)
+UNKNOWN = 'N/D'
+
+# Camadas da base (estado incremental) e da tabela agregada (consulta)
+STATE_LAYER = 'state'
+TABLE_LAYER = 'final'
+PREFIX = 'agregados'
+
+# Ids por partição da base (faixas de id consecutivas)
+PARTITION_WIDTH = 10000
+
+def month_of(column):
+    """Preparo que deriva a dimensão 'mes' (AAAA-MM) de uma coluna de data."""
+    def prepare(df):
+        dates = pd.to_datetime(df[column], errors='coerce', format='ISO8601')
+        return df.assign(mes=dates.dt.to_period('M'))
+    return prepare
+
+@dataclass
+class CubeSpec:
+    """Definição de um cubo.
+
+    - key: chave das linhas de origem (a contribuição de cada chave é substituída a cada atualização);
+    - dimensions: colunas do agregado;
+    - append_only: chaves já vistas são ignoradas (ex.: votos de uma votação não mudam);
+    - prepare: função aplicada às linhas de origem antes da contagem (ex.: derivar o mês);
+    - partition_width: ids por partição da base (pela primeira coluna da chave).
+    """
+    name: str
+    key: list
+    dimensions: list
+    append_only: bool = False
+    prepare: Optional[Callable] = None
+    partition_width: int = PARTITION_WIDTH
+
+CUBES = {
+    'deputados_partido_uf': CubeSpec('deputados_partido_uf', ['id'], ['siglaPartido', 'siglaUf', 'regiao']),
+    'proposicoes_tipo_mes': CubeSpec('proposicoes_tipo_mes', ['id'], ['siglaTipo', 'mes'],
+                                     prepare=month_of('dataApresentacao')),
+    'votos_partido_mes': CubeSpec('votos_partido_mes', ['idVotacao'], ['siglaPartido', 'mes', 'voto'],
+                                  append_only=True, prepare=month_of('dataRegistroVoto')),
+}
+
+def _counts(base, dimensions):
+    """Soma de 'total' por dimensões (Series indexada pelas dimensões)."""
+    return base.groupby(dimensions, sort=False)['total'].sum().astype('int64')
+
+def _partition_ids(values, width):
+    """Partição de cada chave: faixa de `width` ids. Chaves em texto (ex.: idVotacao '2265603-43')
+    usam o número inicial."""
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values.astype(str).str.extract(r'^(\d+)', expand=False), errors='coerce')
+    return (values.fillna(0) // width).astype('int64').to_numpy()
+
+def _table_hash(table, dimensions):
+    """Hash do conteúdo da tabela agregada (independente da ordem das linhas e dos tipos lidos)."""
+    normalized = table[dimensions].astype(str).assign(total=table['total'].astype('int64'))
+    normalized = normalized.sort_values(dimensions, ignore_index=True)
+    return hashlib.sha1(pd.util.hash_pandas_object(normalized, index=False).to_numpy().tobytes()).hexdigest()
+
+class MaterializedAggregate:
+    """Cubo mantido incrementalmente, com a base particionada por faixas de chave.
+
+    Uso:
+        cube = MaterializedAggregate.load(storage, CUBES['proposicoes_tipo_mes'])
+        cube.update(delta_df)                 # upsert das chaves do delta
+        cube.update(snapshot_df, snapshot=True)  # chaves ausentes do snapshot são removidas
+        cube.update(delta_df, deleted=keys_df)   # delta com exclusões explícitas (CDC)
+        cube.save(storage); cube.table
+
+    Apenas as partições das chaves do delta (ou todas, com snapshot=True) são
+    lidas e regravadas.
+    """
+
+    def __init__(self, spec, storage=None, manifest=None, counts=None):
+        self.spec = spec
+        self.storage = storage
+        self.manifest = manifest or {'versao': 0, 'particoes': {}, 'hash_tabela': None}
+        self.parts = {}
+        self.dirty = set()
+        self._counts = counts if counts is not None else _counts(self._empty_base(), spec.dimensions)
+
+    def _empty_base(self):
+        return pd.DataFrame(columns=self.spec.key + self.spec.dimensions + ['total'])
+
+    def _partition_entity(self, part):
+        return f"{PREFIX}/{self.spec.name}_base/{part:06d}"
+
+    def _partitions_of(self, df):
+        return _partition_ids(df[self.spec.key[0]], self.spec.partition_width)
+
+    def _load_partitions(self, parts):
+        """Carrega da camada state as partições ainda não lidas (vazias se não existirem)."""
+        for part in parts:
+            if part in self.parts:
+                continue
+            info = self.manifest['particoes'].get(str(part))
+            if info is None:
+                self.parts[part] = self._empty_base()
+                continue
+            base = self.storage.read(self.storage.location(STATE_LAYER, self._partition_entity(part),
+                                                           info['versao']))
+            for col in self.spec.dimensions:
+                base[col] = base[col].astype(object)
+            self.parts[part] = base
+
+    @property
+    def base(self):
+        """Base completa (carrega todas as partições)."""
+        self._load_partitions(int(part) for part in self.manifest['particoes'])
+        frames = [base for base in self.parts.values() if not base.empty]
+        return pd.concat(frames, ignore_index=True) if frames else self._empty_base()
+
+    def _prepare_base(self, df):
+        """Contagem das linhas de origem por chave e dimensões, com dimensões como texto."""
+        spec = self.spec
+        if spec.prepare is not None:
+            df = spec.prepare(df)
+        if not spec.append_only:
+            df = df.drop_duplicates(subset=spec.key, keep='last')
+        base = df.groupby(spec.key + spec.dimensions, observed=True, dropna=False, sort=False).size()
+        base = base.rename('total').reset_index()
+        for col in spec.dimensions:
+            values = base[col]
+            base[col] = values.astype(object).where(values.notna(), UNKNOWN).map(str)
+        return base
+
+    def _key_index(self, df):
+        return pd.MultiIndex.from_frame(df[self.spec.key].astype(object))
+
+    def _merge(self, base, new, deleted, snapshot):
+        """Aplica o delta a uma partição. Retorna (partição nova, contribuições removidas, novas)."""
+        spec = self.spec
+        removed = []
+        if deleted is not None:
+            gone = self._key_index(base).isin(self._key_index(deleted))
+            removed.append(base[gone])
+            base = base[~gone]
+        if spec.append_only:
+            new = new[~self._key_index(new).isin(self._key_index(base))]
+            kept = base
+        elif snapshot:
+            kept = base.iloc[0:0]
+            removed.append(base)
+        else:
+            replaced = self._key_index(base).isin(self._key_index(new))
+            kept = base[~replaced]
+            removed.append(base[replaced])
+        return pd.concat([kept, new], ignore_index=True), removed, new
+
+    def update(self, df, snapshot=False, deleted=None):
+        """Incorpora as linhas de df (delta ou, com snapshot=True, o conjunto completo).
+
+        deleted: DataFrame com as chaves excluídas, cujas contribuições são removidas.
+        """
+        spec = self.spec
+        if df is not None:
+            missing = [col for col in spec.key if col not in df.columns]
+            if missing:
+                raise ValueError(f"Colunas da chave ausentes para {spec.name}: {missing}")
+        if deleted is not None and deleted.empty:
+            deleted = None
+        if deleted is not None and spec.append_only:
+            raise ValueError(f"O agregado {spec.name} não aceita exclusões")
+
+        new = self._prepare_base(df) if df is not None else self._empty_base()
+        new_groups = dict(tuple(new.groupby(self._partitions_of(new), sort=False))) if len(new) else {}
+        deleted_groups = dict(tuple(deleted.groupby(self._partitions_of(deleted), sort=False))) \
+            if deleted is not None else {}
+        touched = set(new_groups) | set(deleted_groups)
+        if snapshot:
+            touched |= {int(part) for part in self.manifest['particoes']} | set(self.parts)
+        self._load_partitions(touched)
+
+        removed, added = [], []
+        for part in touched:
+            self.parts[part], part_removed, part_new = self._merge(
+                self.parts[part], new_groups.get(part, new.iloc[0:0]), deleted_groups.get(part), snapshot)
+            removed.extend(part_removed)
+            added.append(part_new)
+        self.dirty |= touched
+
+        removed = pd.concat(removed, ignore_index=True) if removed else self._empty_base()
+        added = pd.concat(added, ignore_index=True) if added else self._empty_base()
+        self._counts = self._counts.sub(_counts(removed, spec.dimensions), fill_value=0) \
+            .add(_counts(added, spec.dimensions), fill_value=0)
+        self._counts = self._counts[self._counts > 0].astype('int64')
+
+        logger.info(f"Agregado {spec.name}: {len(added)} contribuições novas, {len(removed)} removidas "
+                    f"em {len(touched)} partições; {len(self._counts)} linhas")
+        return self
+
+    @property
+    def table(self):
+        """Tabela agregada: dimensões e total, ordenada pelas dimensões."""
+        table = self._counts.rename('total').reset_index()
+        return table.sort_values(self.spec.dimensions, ignore_index=True)
+
+    def save(self, storage):
+        """Grava as partições alteradas da base (state), a tabela agregada (final) e o manifesto.
+
+        O manifesto é gravado por último: uma gravação interrompida deixa o
+        manifesto anterior, que ainda aponta para as versões antigas das partições.
+        """
+        spec = self.spec
+        stamp = f"{self.manifest['versao'] + 1:08d}"
+        partitions = dict(self.manifest['particoes'])
+        for part in sorted(self.dirty):
+            base = self.parts[part]
+            if base.empty:
+                partitions.pop(str(part), None)
+                continue
+            storage.write(base, STATE_LAYER, self._partition_entity(part), stamp)
+            partitions[str(part)] = {'versao': stamp, 'linhas': len(base), 'total': int(base['total'].sum())}
+
+        table = self.table
+        location = storage.write(table, TABLE_LAYER, f"{PREFIX}/{spec.name}")
+        self.manifest = {'versao': int(stamp), 'particoes': partitions,
+                         'hash_tabela': _table_hash(table, spec.dimensions)}
+        _write_manifest(_manifest_path(storage, spec), self.manifest)
+
+        # Versões substituídas (e restos de gravações interrompidas) das partições regravadas
+        for part in self.dirty:
+            current = partitions.get(str(part), {}).get('versao')
+            for version, old_location in storage.partitions(STATE_LAYER, self._partition_entity(part)):
+                if version != current:
+                    storage.delete(old_location)
+        self.dirty = set()
+        return location
+
+    @classmethod
+    def load(cls, storage, spec):
+        """Carrega o manifesto e a tabela do cubo salvo (vazio se não houver).
+
+        As partições da base são lidas sob demanda. Se a tabela gravada não
+        corresponder ao hash do manifesto, as contagens são reconstruídas da base.
+        """
+        path = _manifest_path(storage, spec)
+        if not os.path.exists(path):
+            return cls(spec, storage)
+
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        table_location = storage.location(TABLE_LAYER, f"{PREFIX}/{spec.name}")
+        counts = None
+        if storage.exists(table_location):
+            table = storage.read(table_location)
+            table[spec.dimensions] = table[spec.dimensions].astype(object)
+            if _table_hash(table, spec.dimensions) == manifest['hash_tabela']:
+                counts = table.set_index(spec.dimensions)['total'].astype('int64')
+        cube = cls(spec, storage, manifest, counts)
+        if counts is None:
+            logger.warning(f"Tabela agregada {spec.name} ausente ou divergente do manifesto; reconstruindo")
+            cube._counts = _counts(cube.base, spec.dimensions)
+        return cube
+
+def _manifest_path(storage, spec):
+    return os.path.join(storage.base_dir, STATE_LAYER, PREFIX, f"{spec.name}.json")
+
+def _write_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def update_aggregate(storage, name, df, snapshot=False, deleted=None):
+    """Carrega, atualiza e grava o cubo `name`. Retorna (local da tabela agregada, tabela)."""
+    cube = MaterializedAggregate.load(storage, CUBES[name]).update(df, snapshot=snapshot, deleted=deleted)
+    return cube.save(storage), cube.table
+
+def publish_aggregate(storage, name, df):
+    """Grava uma tabela agregada calculada fora dos cubos (ex.: coesão) em final/agregados."""
+    return storage.write(df, TABLE_LAYER, f"{PREFIX}/{name}")
@@ -5,34 +5,277 @@ import requests
 import pandas as pd
 import json
 import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+from utils.esquemas import apply_schema
+from utils.limitador import parse_retry_after
+from utils.metricas import get_recorder, timed_iter
 
 logger = logging.getLogger(__name__)
 
+# Status HTTP considerados transitórios (repetidos com backoff)
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Status que indicam limite de taxa ou sobrecarga (respeitam Retry-After e reduzem a taxa)
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+# Tamanho máximo de página aceito pela API (parâmetro "itens")
+MAX_PAGE_SIZE = 100
+
+# Número padrão de requisições simultâneas nas buscas em lote
+DEFAULT_MAX_WORKERS = 8
+
+class CamaraApiError(Exception):
+    """Falha definitiva ao obter dados da API (após as novas tentativas)."""
+
+@dataclass
+class ClientStats:
+    """Estatísticas acumuladas das requisições de um cliente."""
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    bytes_received: int = 0
+    elapsed_seconds: float = 0.0
+    throttled_seconds: float = 0.0
+
 class CamaraApiClient:
     """Cliente para a API de Dados Abertos da Câmara dos Deputados."""
     
-    def __init__(self):
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0,
+                 max_retries=5, backoff_factor=0.5, backoff_max=30.0, cache=None, metrics=None,
+                 rate_limiter=None, retry_after_max=600.0):
         self.base_url = "https://dadosabertos.camara.leg.br/api/v2"
+        # Cache opcional de respostas (ResponseCache de utils.cache_api)
+        self.cache = cache
+        # Limitador de taxa opcional (RateLimiter de utils.limitador), compartilhável entre clientes
+        self.rate_limiter = rate_limiter
+        # Registrador de métricas por chamada (padrão: o ativo em utils.metricas, sem custo se desligado)
+        self.metrics = metrics if metrics is not None else get_recorder()
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        # Limite de segurança para o Retry-After do servidor (respeitado mesmo acima de backoff_max)
+        self.retry_after_max = retry_after_max
+        self.stats = ClientStats()
+        self._stats_lock = threading.Lock()
+        
+        # Sessão com pool de conexões keep-alive (evita novo handshake TCP+TLS por chamada)
+        self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Fecha a sessão e libera as conexões do pool."""
+        self.session.close()
+    
+    def get_stats(self):
+        """Retorna um dicionário com as estatísticas do cliente."""
+        with self._stats_lock:
+            stats = asdict(self.stats)
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        return stats
+    
+    def _record(self, **increments):
+        with self._stats_lock:
+            for field, value in increments.items():
+                setattr(self.stats, field, getattr(self.stats, field) + value)
+    
+    def _backoff_delay(self, attempt):
+        """Backoff exponencial com jitter completo."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
     
     def get_data(self, endpoint, params=None):
         
+        # Resultado da chamada para as métricas: status final, novas tentativas e bytes
+        call = {"status": "error", "retries": 0, "bytes": 0}
+        start = time.perf_counter()
+        try:
+            return self._get_data(endpoint, params, call)
+        finally:
+            self.metrics.record_request(endpoint, call["status"], time.perf_counter() - start,
+                                        call["bytes"], call["retries"])
+    
+    def _get_data(self, endpoint, params, call):
+        cached = None
+        headers = {}
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, params)
+            if cached is not None:
+                if self.cache.is_fresh(cached):
+                    call["status"] = "cache"
+                    return cached["body"]
+                headers = self.cache.validators(cached)
+        
         url = f"{self.base_url}/{endpoint}"
         logger.info(f"Fazendo requisição para: {url}")
         
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self._record(throttled_seconds=self.rate_limiter.acquire())
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                self._record(requests=1, bytes_received=len(response.content),
+                             elapsed_seconds=time.perf_counter() - start)
+                call["status"] = response.status_code
+                call["bytes"] += len(response.content)
+                
+                # 429/503 indicam sobrecarga: o servidor pode pedir uma pausa (Retry-After)
+                retry_after = None
+                if response.status_code in THROTTLE_STATUS_CODES:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.penalize(retry_after)
+                elif self.rate_limiter is not None and response.status_code < 400:
+                    self.rate_limiter.reward()
+                
+                if response.status_code == 304 and cached is not None:
+                    # Conteúdo não mudou desde a última resposta armazenada
+                    self.cache.refresh(endpoint, params, cached)
+                    self._record(successes=1)
+                    return cached["body"]
+                
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    delay = max(self._backoff_delay(attempt), min(retry_after or 0, self.retry_after_max))
+                    logger.warning(f"Status {response.status_code} em {url}; nova tentativa em {delay:.2f}s")
+                    self._record(retries=1)
+                    call["retries"] += 1
+                    time.sleep(delay)
+                    continue
+                
+                response.raise_for_status()
+                data = response.json()
+                self._record(successes=1)
+                if self.cache is not None:
+                    self.cache.put(endpoint, params, data,
+                                   etag=response.headers.get("ETag"),
+                                   last_modified=response.headers.get("Last-Modified"))
+                return data
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(requests=1, elapsed_seconds=time.perf_counter() - start)
+                call["status"] = "error"
+                if attempt < self.max_retries:
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"Falha de conexão em {url} ({e}); nova tentativa em {delay:.2f}s")
+                    self._record(retries=1)
+                    call["retries"] += 1
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Erro na requisição: {e}")
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"Erro HTTP: {e}")
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Erro na requisição: {e}")
+            except json.JSONDecodeError:
+                logger.error("Erro ao decodificar JSON")
+            break
+        
+        self._record(failures=1)
+        return None
+    
+    def iter_pages(self, endpoint, params=None, page_size=MAX_PAGE_SIZE, max_pages=None):
+        """Percorre sob demanda as páginas de um endpoint seguindo o link rel="next".
+        
+        Gera o JSON de cada página; levanta CamaraApiError se alguma página falhar,
+        para que uma extração nunca seja truncada silenciosamente.
+        """
+        params = dict(params or {})
+        params["itens"] = min(page_size, MAX_PAGE_SIZE)
+        page = int(params.get("pagina", 1))
+        pages_read = 0
+        
+        while max_pages is None or pages_read < max_pages:
+            params["pagina"] = page
+            data = self.get_data(endpoint, params)
+            if data is None or "dados" not in data:
+                raise CamaraApiError(f"Falha ao obter página {page} de {endpoint}")
+            
+            yield data
+            pages_read += 1
+            
+            links = data.get("links") or []
+            if not any(link.get("rel") == "next" for link in links):
+                break
+            page += 1
+    
+    def iter_records(self, endpoint, params=None, page_size=MAX_PAGE_SIZE, max_pages=None):
+        """Gera os registros ("dados") de todas as páginas de um endpoint."""
+        for data in self.iter_pages(endpoint, params, page_size, max_pages):
+            yield from data["dados"]
+    
+    def iter_frames(self, endpoint, params=None, page_size=MAX_PAGE_SIZE, max_pages=None):
+        """Gera um DataFrame por página não vazia de um endpoint (cada página medida como etapa "extract")."""
+        frames = (pd.DataFrame(data["dados"])
+                  for data in self.iter_pages(endpoint, params, page_size, max_pages) if data["dados"])
+        return timed_iter(frames, "extract")
+    
+    def write_csv(self, endpoint, file_path, params=None, page_size=MAX_PAGE_SIZE, max_pages=None):
+        """Grava todas as páginas de um endpoint em CSV, uma página por vez.
+        
+        Retorna o número de registros gravados. As colunas são fixadas pela
+        primeira página para manter o arquivo consistente.
+        """
+        columns = None
+        total = 0
+        for frame in self.iter_frames(endpoint, params, page_size, max_pages):
+            if columns is None:
+                columns = list(frame.columns)
+                frame.to_csv(file_path, index=False, mode="w")
+            else:
+                frame.reindex(columns=columns).to_csv(file_path, index=False, mode="a", header=False)
+            total += len(frame)
+        
+        logger.info(f"{total} registros de {endpoint} gravados em {file_path}")
+        return total
+    
+    def _get_all_pages(self, endpoint, params=None, page_size=MAX_PAGE_SIZE, max_pages=None, schema=None):
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"Erro HTTP: {e}")
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro na requisição: {e}")
-            return None
-        except json.JSONDecodeError:
-            logger.error("Erro ao decodificar JSON")
+            frames = list(self.iter_frames(endpoint, params, page_size, max_pages))
+        except CamaraApiError as e:
+            logger.error(str(e))
             return None
+        if not frames:
+            return pd.DataFrame()
+        # Tipos compactos aplicados após a concatenação (categorias de páginas diferentes virariam object)
+        return apply_schema(pd.concat(frames, ignore_index=True), schema, inplace=True)
+    
+    def fetch_many(self, fetch, items, max_workers=DEFAULT_MAX_WORKERS):
+        """Aplica fetch a cada item em paralelo, com no máximo max_workers simultâneos.
+        
+        Os resultados seguem a ordem de items. Um item que falhe (exceção ou
+        retorno None) vira None sem interromper os demais.
+        """
+        items = list(items)
+        
+        def safe_fetch(item):
+            try:
+                return fetch(item)
+            except Exception as e:
+                logger.error(f"Erro ao processar item {item}: {e}")
+                return None
+        
+        if max_workers <= 1 or len(items) <= 1:
+            return [safe_fetch(item) for item in items]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(safe_fetch, items))
     
     def get_deputies(self, status="exercise"):
         
@@ -44,11 +287,7 @@ class CamaraApiClient:
         if status:
             params["siglaSituacao"] = status
             
-        data = self.get_data("deputados", params)
-        
-        if data and "dados" in data:
-            return pd.DataFrame(data["dados"])
-        return None
+        return self._get_all_pages("deputados", params, schema="deputados")
     
     def get_deputy_details(self, deputy_id):
         """Obtém detalhes de um deputado específico."""
@@ -57,29 +296,42 @@ class CamaraApiClient:
             return data["dados"]
         return None
     
-    def get_propositions(self, year=None, proposition_type=None, limit=100):
+    def get_deputy_details_many(self, deputy_ids, max_workers=DEFAULT_MAX_WORKERS):
+        """Obtém os detalhes de vários deputados em paralelo (ordem preservada)."""
+        return self.fetch_many(self.get_deputy_details, deputy_ids, max_workers)
+    
+    def get_propositions(self, year=None, proposition_type=None, limit=MAX_PAGE_SIZE, max_pages=None,
+                         start_date=None, end_date=None):
         
-        params = {"itens": limit}
+        params = {}
         
         if year:
             params["ano"] = year
             
         if proposition_type:
             params["siglaTipo"] = proposition_type
-            
-        data = self.get_data("proposicoes", params)
         
-        if data and "dados" in data:
-            return pd.DataFrame(data["dados"])
-        return None
+        # Intervalo de tramitação: proposições novas ou alteradas no período
+        if start_date:
+            params["dataInicio"] = str(start_date)
+        
+        if end_date:
+            params["dataFim"] = str(end_date)
+            
+        return self._get_all_pages("proposicoes", params, page_size=limit, max_pages=max_pages,
+                                   schema="proposicoes")
     
     def get_votes(self, proposition_id):
         
         data = self.get_data(f"proposicoes/{proposition_id}/votacoes")
         if data and "dados" in data:
-            return pd.DataFrame(data["dados"])
+            return apply_schema(pd.DataFrame(data["dados"]), "votacoes", inplace=True)
         return None
     
+    def get_votes_many(self, proposition_ids, max_workers=DEFAULT_MAX_WORKERS):
+        """Obtém as votações de várias proposições em paralelo (ordem preservada)."""
+        return self.fetch_many(self.get_votes, proposition_ids, max_workers)
+    
     def get_vote_details(self, vote_id):
         
         data = self.get_data(f"votacoes/{vote_id}/votos")
@@ -89,7 +341,19 @@ class CamaraApiClient:
     
     def get_parties(self):
         
-        data = self.get_data("partidos")
+        return self._get_all_pages("partidos")
+    
+    def get_vote_details_many(self, vote_ids, max_workers=DEFAULT_MAX_WORKERS):
+        """Obtém os votos de várias votações em paralelo (ordem preservada)."""
+        return self.fetch_many(self.get_vote_details, vote_ids, max_workers)
+    
+    def get_vote_orientations(self, vote_id):
+        """Obtém as orientações de bancada (partidos, blocos, Governo) de uma votação."""
+        data = self.get_data(f"votacoes/{vote_id}/orientacoes")
         if data and "dados" in data:
             return pd.DataFrame(data["dados"])
-        return None
\ No newline at end of file
+        return None
+    
+    def get_vote_orientations_many(self, vote_ids, max_workers=DEFAULT_MAX_WORKERS):
+        """Obtém as orientações de várias votações em paralelo (ordem preservada)."""
+        return self.fetch_many(self.get_vote_orientations, vote_ids, max_workers)
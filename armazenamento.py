@@ -0,0 +1,318 @@
+"""
+Camada de armazenamento das etapas raw/processed/final (CSV ou Parquet particionado)
+"""
+import logging
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from utils.esquemas import STRING_DTYPE, apply_schema, schema_for
+from utils.metricas import get_recorder, timed_iter
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow só é necessário para o formato parquet
+    pa = ds = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Linhas por bloco nas leituras em streaming (iter_read)
+DEFAULT_CHUNK_ROWS = 100000
+
+# Sufixo de data dos arquivos CSV ({entity}_{AAAAMMDD}.csv, ou AAAAMMDDHHMMSS)
+_DATE_SUFFIX = re.compile(r'_\d{8,14}$')
+
+# Operadores aceitos nos filtros (coluna, operador, valor)
+FILTER_OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not in')
+
+def _filter_mask(df, filters):
+    """Máscara booleana equivalente aos filtros, para leituras sem pushdown."""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        series = df[column]
+        if op == '==':
+            mask &= series == value
+        elif op == '!=':
+            mask &= series != value
+        elif op == '<':
+            mask &= series < value
+        elif op == '<=':
+            mask &= series <= value
+        elif op == '>':
+            mask &= series > value
+        elif op == '>=':
+            mask &= series >= value
+        elif op == 'in':
+            mask &= series.isin(value)
+        elif op == 'not in':
+            mask &= ~series.isin(value)
+        else:
+            raise ValueError(f"Operador de filtro inválido: {op}")
+    return mask
+
+def _filter_expression(filters):
+    """Converte filtros (coluna, operador, valor) em expressão do pyarrow.dataset."""
+    expression = None
+    for column, op, value in filters:
+        field = ds.field(column)
+        if op == '==':
+            term = field == value
+        elif op == '!=':
+            term = field != value
+        elif op == '<':
+            term = field < value
+        elif op == '<=':
+            term = field <= value
+        elif op == '>':
+            term = field > value
+        elif op == '>=':
+            term = field >= value
+        elif op == 'in':
+            term = field.isin(list(value))
+        elif op == 'not in':
+            term = ~field.isin(list(value))
+        else:
+            raise ValueError(f"Operador de filtro inválido: {op}")
+        expression = term if expression is None else expression & term
+    return expression
+
+class CsvStorage:
+    """Armazena cada conjunto como um arquivo CSV: {layer}/{entity}_{data}.csv."""
+
+    format = 'csv'
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+
+    def location(self, layer, entity, extraction_date=None):
+        name = f"{entity}_{extraction_date}" if extraction_date else entity
+        return os.path.join(self.base_dir, layer, f"{name}.csv")
+
+    def exists(self, location):
+        return os.path.exists(location)
+
+    def partitions(self, layer, entity):
+        """Extrações gravadas de uma entidade: lista ordenada de (data, local)."""
+        directory = os.path.dirname(self.location(layer, entity))
+        pattern = re.compile(re.escape(os.path.basename(entity)) + r'_(\d+)\.csv$')
+        if not os.path.isdir(directory):
+            return []
+        matches = (pattern.match(name) for name in os.listdir(directory))
+        return sorted((match.group(1), os.path.join(directory, match.group(0))) for match in matches if match)
+
+    def delete(self, location):
+        if os.path.isdir(location):
+            shutil.rmtree(location)
+        elif os.path.exists(location):
+            os.remove(location)
+
+    def entity_of(self, location):
+        """Nome da entidade de um local gravado (ex.: raw/votacoes_lotes/00001_20240101.csv -> votacoes_lotes/00001)."""
+        parts = os.path.relpath(location, self.base_dir).split(os.sep)[1:]
+        return _DATE_SUFFIX.sub('', os.path.splitext('/'.join(parts))[0]) if parts else None
+
+    def write(self, df, layer, entity, extraction_date=None, partition_cols=None):
+        location, _ = self.write_frames([df], layer, entity, extraction_date, partition_cols)
+        return location
+
+    def write_frames(self, frames, layer, entity, extraction_date=None, partition_cols=None):
+        """Grava uma sequência de DataFrames incrementalmente. Retorna (local, total de linhas).
+
+        Colunas registradas no esquema da entidade (utils.esquemas) são convertidas antes da gravação.
+        """
+        schema = schema_for(entity)
+        if schema:
+            frames = (apply_schema(frame, schema) for frame in frames)
+        with get_recorder().stage('write') as stage:
+            location, total = self._write_frames(frames, layer, entity, extraction_date, partition_cols)
+            stage.rows_out = total
+        return location, total
+
+    def read(self, location, columns=None, filters=None):
+        with get_recorder().stage('read') as stage:
+            df = apply_schema(self._read(location, columns, filters), schema_for(self.entity_of(location)),
+                              inplace=True)
+            stage.rows_out = len(df)
+        return df
+
+    def iter_read(self, location, columns=None, filters=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Lê o conjunto em blocos de até chunk_rows linhas (memória limitada ao bloco)."""
+        schema = schema_for(self.entity_of(location))
+        chunks = self._iter_read(location, columns, filters, chunk_rows)
+        if schema:
+            chunks = (apply_schema(chunk, schema, inplace=True) for chunk in chunks)
+        return timed_iter(chunks, 'read')
+
+    def _write_frames(self, frames, layer, entity, extraction_date, partition_cols):
+        location = self.location(layer, entity, extraction_date)
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+
+        columns = None
+        total = 0
+        for frame in frames:
+            if columns is None:
+                columns = list(frame.columns)
+                frame.to_csv(location, index=False, mode='w')
+            else:
+                frame.reindex(columns=columns).to_csv(location, index=False, mode='a', header=False)
+            total += len(frame)
+
+        logger.info(f"{total} registros gravados em {location}")
+        return location, total
+
+    def _read(self, location, columns, filters):
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | {column for column, _, _ in filters or []}
+            usecols = lambda column: column in wanted
+        df = pd.read_csv(location, usecols=usecols)
+
+        if filters:
+            df = df[_filter_mask(df, filters)].reset_index(drop=True)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+
+    def _iter_read(self, location, columns, filters, chunk_rows):
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | {column for column, _, _ in filters or []}
+            usecols = lambda column: column in wanted
+
+        for chunk in pd.read_csv(location, usecols=usecols, chunksize=chunk_rows):
+            if filters:
+                chunk = chunk[_filter_mask(chunk, filters)]
+            if columns is not None:
+                chunk = chunk[[column for column in columns if column in chunk.columns]]
+            if not chunk.empty:
+                yield chunk
+
+    def export_csv(self, location, file_path):
+        shutil.copyfile(location, file_path)
+        return file_path
+
+class ParquetStorage(CsvStorage):
+    """Armazena cada conjunto como dataset Parquet particionado (hive).
+
+    Layout: {layer}/{entity}/data_extracao={data}/{coluna}={valor}/part-*.parquet.
+    As leituras usam projeção de colunas e pushdown de filtros do pyarrow.
+    """
+
+    format = 'parquet'
+
+    def __init__(self, base_dir):
+        if pa is None:
+            raise ImportError("pyarrow é necessário para o armazenamento em Parquet")
+        super().__init__(base_dir)
+
+    def location(self, layer, entity, extraction_date=None):
+        location = os.path.join(self.base_dir, layer, entity)
+        if extraction_date:
+            location = os.path.join(location, f"data_extracao={extraction_date}")
+        return location
+
+    def _write_frames(self, frames, layer, entity, extraction_date, partition_cols):
+        location = self.location(layer, entity, extraction_date)
+        # Regravar a mesma extração substitui o conteúdo anterior
+        if os.path.exists(location):
+            shutil.rmtree(location)
+        os.makedirs(location, exist_ok=True)
+
+        schema = None
+        total = 0
+        for i, frame in enumerate(frames):
+            if schema is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                # Colunas totalmente nulas na primeira parte viram texto para as próximas e os
+                # índices das categorias usam int32 (as próximas partes podem ter mais valores)
+                schema = pa.schema([_portable_field(field) for field in table.schema]).remove_metadata()
+                table = table.cast(schema)
+            else:
+                table = pa.Table.from_pandas(frame.reindex(columns=schema.names), schema=schema,
+                                             preserve_index=False)
+
+            cols = [col for col in partition_cols or [] if col in table.column_names]
+            if cols:
+                pq.write_to_dataset(table, root_path=location, partition_cols=cols,
+                                    basename_template=f"part-{i}-{{i}}.parquet",
+                                    existing_data_behavior='overwrite_or_ignore')
+            else:
+                pq.write_table(table, os.path.join(location, f"part-{i}.parquet"))
+            total += len(frame)
+
+        logger.info(f"{total} registros gravados em {location}")
+        return location, total
+
+    def partitions(self, layer, entity):
+        root = self.location(layer, entity)
+        if not os.path.isdir(root):
+            return []
+        return sorted((name.split('=', 1)[1], os.path.join(root, name)) for name in os.listdir(root)
+                      if name.startswith('data_extracao=') and self.exists(os.path.join(root, name)))
+
+    def entity_of(self, location):
+        """Nome da entidade de um dataset (ignora os diretórios de partição coluna=valor)."""
+        parts = os.path.relpath(location, self.base_dir).split(os.sep)[1:]
+        return '/'.join(part for part in parts if '=' not in part) or None
+
+    def exists(self, location):
+        return os.path.isdir(location) and any(
+            name.endswith('.parquet') for _, _, files in os.walk(location) for name in files
+        )
+
+    def _read(self, location, columns, filters):
+        dataset = ds.dataset(location, format='parquet', partitioning='hive')
+        if columns is not None:
+            columns = [column for column in columns if column in dataset.schema.names]
+        expression = _filter_expression(filters) if filters else None
+
+        table = dataset.to_table(columns=columns, filter=expression)
+        return table.to_pandas(types_mapper=_arrow_types_mapper())
+
+    def _iter_read(self, location, columns, filters, chunk_rows):
+        dataset = ds.dataset(location, format='parquet', partitioning='hive')
+        if columns is not None:
+            columns = [column for column in columns if column in dataset.schema.names]
+        expression = _filter_expression(filters) if filters else None
+
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas(types_mapper=_arrow_types_mapper())
+
+    def export_csv(self, location, file_path):
+        header = True
+        for chunk in self.iter_read(location):
+            chunk.to_csv(file_path, index=False, mode='w' if header else 'a', header=header)
+            header = False
+        if header:  # conjunto vazio: grava só o cabeçalho
+            self.read(location).to_csv(file_path, index=False)
+        return file_path
+
+def _portable_field(field):
+    """Tipo de coluna da primeira parte que aceita as partes seguintes do mesmo conjunto."""
+    if pa.types.is_null(field.type):
+        return field.with_type(pa.string())
+    if pa.types.is_dictionary(field.type):
+        return field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+    return field
+
+def _arrow_types_mapper():
+    """Textos do Parquet lidos diretamente como strings Arrow (sem passar por objetos Python)."""
+    if STRING_DTYPE.storage != 'pyarrow':
+        return None
+    return {pa.string(): STRING_DTYPE, pa.large_string(): STRING_DTYPE}.get
+
+STORAGE_CLASSES = {
+    'csv': CsvStorage,
+    'parquet': ParquetStorage,
+}
+
+def get_storage(storage_format, base_dir):
+    """Instancia a camada de armazenamento do formato informado."""
+    if storage_format not in STORAGE_CLASSES:
+        raise ValueError(f"Formato de armazenamento inválido: {storage_format}")
+    return STORAGE_CLASSES[storage_format](base_dir)
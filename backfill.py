@@ -0,0 +1,215 @@
+"""
+Carga histórica (backfill) de proposições e votações em janelas paralelas
+
+O intervalo de datas de apresentação é dividido em janelas de um mês ou de um
+ano, extraídas em paralelo por processos. Cada janela concluída é registrada
+em um checkpoint JSON; ao reiniciar, as janelas já concluídas são puladas e
+uma janela interrompida é refeita do zero (a gravação substitui a anterior).
+Uma janela que só cobria parte do período (ex.: o ano corrente) é refeita
+quando o intervalo pedido vai além dela.
+
+Uso (na pasta de DAGs do Airflow):
+    python -m utils.backfill --inicio 2001-01-01 --fim 2023-12-31 --granularidade ano --processos 4
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+
+import pandas as pd
+
+from utils.api_cliente import CamaraApiClient
+from utils.armazenamento import get_storage
+from utils.cache_api import ResponseCache
+from utils.limitador import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = '/opt/airflow/data'
+
+@dataclass
+class BackfillConfig:
+    """Parâmetros repassados a cada processo (precisam ser serializáveis com pickle)."""
+    data_dir: str = DATA_DIR
+    storage_format: str = 'parquet'
+    cache_dir: str = None
+    rate_limiter_path: str = None
+    api_rate: float = 10.0
+    api_burst: int = 10
+    api_max_rate: float = 50.0
+    max_workers: int = 8
+    votes: bool = True
+
+    def __post_init__(self):
+        # Limite de taxa em arquivo sob data_dir (o mesmo da DAG): todos os processos dividem a cota
+        if self.rate_limiter_path is None:
+            self.rate_limiter_path = os.path.join(self.data_dir, 'state', 'rate_limiter.json')
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.data_dir, 'state', 'backfill.json')
+
+def iter_windows(start, end, granularity='month'):
+    """Divide [start, end] em janelas alinhadas ao mês ou ao ano: (chave, início, fim)."""
+    if granularity not in ('month', 'year'):
+        raise ValueError(f"Granularidade inválida: {granularity}")
+    start = pd.Timestamp(start).date()
+    end = pd.Timestamp(end).date()
+    first = pd.Timestamp(start).to_period('M' if granularity == 'month' else 'Y').start_time
+    for period_start in pd.date_range(first, end, freq='MS' if granularity == 'month' else 'YS'):
+        period_end = (period_start + pd.offsets.MonthEnd(1) if granularity == 'month'
+                      else period_start + pd.offsets.YearEnd(1))
+        key = period_start.strftime('%Y-%m' if granularity == 'month' else '%Y')
+        yield key, max(period_start.date(), start), min(period_end.date(), end)
+
+class BackfillCheckpoint:
+    """Janelas concluídas (chave -> locais e contagens) em JSON, gravado pelo processo coordenador."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.completed = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f).get('completed', {})
+
+    def is_done(self, start, end):
+        """Se [start, end] está coberto por uma janela concluída (de qualquer granularidade)."""
+        return any(done['inicio'] <= str(start) and str(end) <= done['fim'] for done in self.completed.values())
+
+    def mark_done(self, key, result):
+        with self._lock:
+            self.completed[key] = result
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated_at': datetime.now().isoformat(), 'completed': self.completed},
+                          f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+def _build_client(config):
+    cache = ResponseCache(config.cache_dir) if config.cache_dir else None
+    rate_limiter = None
+    if config.api_rate > 0:
+        # Estado em arquivo: todos os processos dividem a mesma cota de requisições
+        rate_limiter = RateLimiter(rate=config.api_rate, burst=config.api_burst, max_rate=config.api_max_rate,
+                                   state_path=config.rate_limiter_path)
+    return CamaraApiClient(pool_size=config.max_workers, cache=cache, rate_limiter=rate_limiter)
+
+def extract_window(key, start, end, config):
+    """Extrai proposições (e suas votações) apresentadas em [start, end] e grava a partição da janela."""
+    storage = get_storage(config.storage_format, config.data_dir)
+    params = {'dataApresentacaoInicio': str(start), 'dataApresentacaoFim': str(end)}
+    result = {'inicio': str(start), 'fim': str(end)}
+
+    with _build_client(config) as client:
+        location, total = storage.write_frames(client.iter_frames('proposicoes', params),
+                                               'raw', f'proposicoes_historico/{key}')
+        result.update(proposicoes=location, proposicoes_linhas=total)
+        if not config.votes or not total:
+            return result
+
+        proposition_ids = sorted(int(prop_id) for prop_id in
+                                 storage.read(location, columns=['id'])['id'].dropna().unique())
+        results = client.get_votes_many(proposition_ids, max_workers=config.max_workers)
+
+    # Janela com falhas não entra no checkpoint (será refeita na próxima execução)
+    failures = [prop_id for prop_id, votes_df in zip(proposition_ids, results) if votes_df is None]
+    if failures:
+        raise ValueError(f"Falha ao extrair votações de {len(failures)} proposições da janela {key}: "
+                         f"{failures[:20]}")
+
+    frames = [votes_df.assign(proposicaoId=prop_id)
+              for prop_id, votes_df in zip(proposition_ids, results) if not votes_df.empty]
+    votes_location, votes_total = storage.write_frames(frames, 'raw', f'votacoes_historico/{key}')
+    result.update(votacoes=votes_location if votes_total else None, votacoes_linhas=votes_total)
+    return result
+
+@dataclass
+class BackfillReport:
+    """Resumo de uma execução do backfill."""
+    completed: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return not self.failed
+
+def run_backfill(start, end, config=None, granularity='month', processes=4, checkpoint=None):
+    """Extrai todas as janelas de [start, end] ainda não concluídas, com até `processes` em paralelo.
+
+    Falhas de uma janela não interrompem as demais; o relatório lista as janelas
+    concluídas, puladas (já no checkpoint) e com falha.
+    """
+    config = config or BackfillConfig()
+    checkpoint = checkpoint or BackfillCheckpoint(config.checkpoint_path)
+    report = BackfillReport()
+
+    pending = []
+    for key, window_start, window_end in iter_windows(start, end, granularity):
+        if checkpoint.is_done(window_start, window_end):
+            report.skipped.append(key)
+        else:
+            pending.append((key, window_start, window_end))
+    logger.info(f"Backfill de {start} a {end}: {len(pending)} janelas pendentes, "
+                f"{len(report.skipped)} já concluídas")
+
+    with ProcessPoolExecutor(max_workers=max(1, processes)) as executor:
+        futures = {executor.submit(extract_window, key, window_start, window_end, config): key
+                   for key, window_start, window_end in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Janela {key} falhou: {e}")
+                report.failed[key] = str(e)
+                continue
+            checkpoint.mark_done(key, result)
+            report.completed.append(key)
+            logger.info(f"Janela {key} concluída: {result.get('proposicoes_linhas', 0)} proposições, "
+                        f"{result.get('votacoes_linhas', 0)} votações")
+
+    report.completed.sort()
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga histórica de proposições e votações da Câmara")
+    parser.add_argument('--inicio', required=True, help="data inicial de apresentação (AAAA-MM-DD)")
+    parser.add_argument('--fim', default=date.today().isoformat(), help="data final (padrão: hoje)")
+    parser.add_argument('--granularidade', choices=['mes', 'ano'], default='mes')
+    parser.add_argument('--processos', type=int, default=4)
+    parser.add_argument('--sem-votacoes', action='store_true', help="extrai apenas as proposições")
+    parser.add_argument('--data-dir', default=os.environ.get('CAMARA_DATA_DIR', DATA_DIR))
+    parser.add_argument('--formato', default=os.environ.get('CAMARA_STORAGE_FORMAT', 'parquet'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    cache_dir = None
+    if os.environ.get('CAMARA_CACHE_ENABLED', '1') == '1':
+        cache_dir = os.environ.get('CAMARA_CACHE_DIR', os.path.join(args.data_dir, 'cache'))
+    config = BackfillConfig(
+        data_dir=args.data_dir,
+        storage_format=args.formato,
+        cache_dir=cache_dir,
+        api_rate=float(os.environ.get('CAMARA_API_RATE', 10)),
+        api_burst=int(os.environ.get('CAMARA_API_BURST', 10)),
+        api_max_rate=float(os.environ.get('CAMARA_API_MAX_RATE', 50)),
+        votes=not args.sem_votacoes,
+    )
+    granularity = 'month' if args.granularidade == 'mes' else 'year'
+    report = run_backfill(args.inicio, args.fim, config, granularity, args.processos)
+
+    print(json.dumps(asdict(report), indent=2))
+    return 0 if report.ok else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
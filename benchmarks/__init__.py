@@ -0,0 +1,17 @@
+"""
+Benchmarks do pipeline (transformações, verificações de qualidade e cliente da API)
+
+Os módulos do projeto são implantados como o pacote `utils` da pasta de DAGs
+(`from utils.api_cliente import ...`). Para rodar os benchmarks a partir da raiz
+do repositório, a raiz é registrada aqui com esse mesmo nome.
+"""
+import os
+import sys
+import types
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'utils' not in sys.modules:
+    _utils = types.ModuleType('utils')
+    _utils.__path__ = [_REPO_ROOT]
+    sys.modules['utils'] = _utils
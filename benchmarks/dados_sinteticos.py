@@ -0,0 +1,177 @@
+"""
+Gerador de dados sintéticos no formato da API da Câmara (deputados, proposições, votações e votos)
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+UFS = np.array(['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO',
+                'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE', 'PI', 'PR',
+                'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO'])
+
+PARTIES = np.array(['PT', 'PL', 'UNIÃO', 'PP', 'MDB', 'PSD', 'REPUBLICANOS', 'PDT', 'PSB',
+                    'PSDB', 'PSOL', 'PODE', 'AVANTE', 'PCdoB', 'CIDADANIA', 'PV', 'NOVO', 'SOLIDARIEDADE'])
+
+PROPOSITION_TYPES = np.array(['PL', 'REQ', 'PLP', 'PEC', 'PDL', 'RIC', 'INC', 'EMC', 'MPV', 'PRC'])
+
+VOTE_VALUES = np.array(['Sim', 'Não', 'Abstenção', 'Obstrução', 'Artigo 17'])
+
+BASE_URL = "https://dadosabertos.camara.leg.br/api/v2"
+
+def _dates(rng, n, start='2019-02-01', days=5 * 365, fmt='%Y-%m-%dT%H:%M'):
+    offsets = rng.integers(0, days * 24 * 60, n)
+    stamps = pd.Timestamp(start) + pd.to_timedelta(offsets, unit='min')
+    return pd.Series(stamps).dt.strftime(fmt).to_numpy()
+
+def generate_deputies(n, seed=0):
+    """Lista de deputados como retornada por `deputados`."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(100000, 100000 + n)
+    return pd.DataFrame({
+        'id': ids,
+        'uri': [f"{BASE_URL}/deputados/{i}" for i in ids],
+        'nome': [f"Deputado {i}" for i in ids],
+        'siglaPartido': rng.choice(PARTIES, n),
+        'siglaUf': rng.choice(UFS, n),
+        'idLegislatura': 57,
+        'urlFoto': [f"https://www.camara.leg.br/internet/deputado/bandep/{i}.jpg" for i in ids],
+        'email': [f"dep.{i}@camara.leg.br" for i in ids],
+    })
+
+def generate_propositions(n, seed=0, max_year=None):
+    """Lista de proposições como retornada por `proposicoes`."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(2000000, 2000000 + n)
+    dates = _dates(rng, n)
+    years = pd.to_datetime(pd.Series(dates)).dt.year.to_numpy()
+    if max_year is not None:
+        years = np.minimum(years, max_year)
+    types = rng.choice(PROPOSITION_TYPES, n)
+    return pd.DataFrame({
+        'id': ids,
+        'uri': [f"{BASE_URL}/proposicoes/{i}" for i in ids],
+        'siglaTipo': types,
+        'codTipo': pd.Series(types).map({t: 100 + k for k, t in enumerate(PROPOSITION_TYPES)}).to_numpy(),
+        'numero': rng.integers(1, 6000, n),
+        'ano': years,
+        'ementa': 'Dispõe sobre matéria de exemplo para benchmark.',
+        'dataApresentacao': dates,
+    })
+
+def generate_votacoes(n, proposition_ids, seed=0):
+    """Votações de proposições como retornadas por `proposicoes/{id}/votacoes`."""
+    rng = np.random.default_rng(seed)
+    proposicao_ids = rng.choice(np.asarray(proposition_ids), n)
+    ids = np.array([f"{p}-{k}" for k, p in enumerate(proposicao_ids)], dtype=object)
+    dates = _dates(rng, n, fmt='%Y-%m-%dT%H:%M:%S')
+    return pd.DataFrame({
+        'id': ids,
+        'uri': [f"{BASE_URL}/votacoes/{i}" for i in ids],
+        'data': [d[:10] for d in dates],
+        'dataHoraRegistro': dates,
+        'siglaOrgao': 'PLEN',
+        'proposicaoObjeto': [f"PL {p % 6000}/2023" for p in proposicao_ids],
+        'descricao': 'Aprovada a matéria.',
+        'aprovacao': rng.integers(0, 2, n),
+        'proposicaoId': proposicao_ids,
+    })
+
+def generate_votos(n, votacoes, deputies, seed=0, cohesion=0.85):
+    """Votos individuais (deputado x votação), já achatados.
+
+    Cada partido segue uma orientação por votação com probabilidade `cohesion`.
+    """
+    rng = np.random.default_rng(seed)
+    votacao_ids = votacoes['id'].to_numpy(dtype=object)
+    deputy_idx = rng.integers(0, len(deputies), n)
+    votacao_idx = rng.integers(0, len(votacao_ids), n)
+
+    parties = deputies['siglaPartido'].to_numpy()[deputy_idx]
+    party_codes = pd.factorize(parties)[0]
+    # Orientação determinística por (votação, partido), com desvios aleatórios
+    orientation = (votacao_idx * 31 + party_codes * 7) % 2
+    values = np.where(rng.random(n) < cohesion, orientation, rng.integers(0, len(VOTE_VALUES), n))
+
+    return pd.DataFrame({
+        'idVotacao': votacao_ids[votacao_idx],
+        'idDeputado': deputies['id'].to_numpy()[deputy_idx],
+        'siglaPartido': parties,
+        'siglaUf': deputies['siglaUf'].to_numpy()[deputy_idx],
+        'voto': VOTE_VALUES[values],
+        'dataRegistroVoto': votacoes['dataHoraRegistro'].to_numpy()[votacao_idx],
+    })
+
+def generate_dataset(rows, seed=0, max_year=None):
+    """Gera os quatro conjuntos com `rows` votos e tamanhos proporcionais para as demais entidades."""
+    deputies = generate_deputies(max(513, rows // 1000), seed)
+    propositions = generate_propositions(max(1000, rows // 10), seed, max_year)
+    votacoes = generate_votacoes(max(100, rows // 500), propositions['id'], seed)
+    votos = generate_votos(rows, votacoes, deputies, seed)
+    return {
+        'deputados': deputies,
+        'proposicoes': propositions,
+        'votacoes': votacoes,
+        'votos': votos,
+    }
+
+# Conjunto -> nome dos arquivos anuais em dadosabertos.camara.leg.br/arquivos
+BULK_FILES = {'proposicoes': 'proposicoes', 'votacoes': 'votacoes', 'votos': 'votacoesVotos',
+              'orientacoes': 'votacoesOrientacoes'}
+
+def _bulk_records(dataset):
+    """Registros no formato dos arquivos anuais (objetos aninhados como no JSON publicado)."""
+    votacoes = dataset['votacoes']
+    votos = dataset['votos']
+    return {
+        'proposicoes': dataset['proposicoes'],
+        'votacoes': pd.DataFrame({
+            **{col: votacoes[col] for col in ['id', 'uri', 'data', 'dataHoraRegistro', 'siglaOrgao',
+                                              'descricao', 'aprovacao']},
+            'ultimaApresentacaoProposicao': [
+                {'descricao': descricao, 'uriProposicao': f"{BASE_URL}/proposicoes/{prop_id}"}
+                for descricao, prop_id in zip(votacoes['proposicaoObjeto'], votacoes['proposicaoId'])
+            ],
+            'proposicoesAfetadas': [[] for _ in range(len(votacoes))],
+        }),
+        'votos': pd.DataFrame({
+            'idVotacao': votos['idVotacao'],
+            'uriVotacao': BASE_URL + '/votacoes/' + votos['idVotacao'].astype(str),
+            'dataHoraVoto': votos['dataRegistroVoto'],
+            'voto': votos['voto'],
+            'deputado_': [
+                {'id': int(deputy_id), 'nome': f"Deputado {deputy_id}", 'siglaPartido': party, 'siglaUf': uf,
+                 'idLegislatura': 57}
+                for deputy_id, party, uf in zip(votos['idDeputado'], votos['siglaPartido'], votos['siglaUf'])
+            ],
+        }),
+        # Orientação do Governo em cada votação
+        'orientacoes': pd.DataFrame({
+            'idVotacao': votacoes['id'],
+            'uriVotacao': BASE_URL + '/votacoes/' + votacoes['id'].astype(str),
+            'siglaBancada': 'Governo',
+            'orientacao': np.where(votacoes['aprovacao'].to_numpy() == 1, 'Sim', 'Não'),
+        }),
+    }
+
+def write_bulk_files(dataset, directory, year, fmt='json'):
+    """Grava o conjunto sintético como arquivos anuais ({arquivo}-{ano}.json|csv) em directory.
+
+    O JSON segue {"dados": [...]}; o CSV é separado por ';', com os objetos
+    aninhados em colunas unidas por '_' (ex.: deputado_id).
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, df in _bulk_records(dataset).items():
+        path = os.path.join(directory, f"{BULK_FILES[name]}-{year}.{fmt}")
+        if fmt == 'json':
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'dados': json.loads(df.to_json(orient='records', force_ascii=False))}, f,
+                          ensure_ascii=False, indent=1)
+        else:
+            flat = pd.json_normalize(json.loads(df.to_json(orient='records')), sep='_')
+            flat.columns = [col.replace('__', '_') for col in flat.columns]
+            flat.to_csv(path, sep=';', index=False, encoding='utf-8')
+        paths[name] = path
+    return paths
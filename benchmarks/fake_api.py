@@ -0,0 +1,214 @@
+"""
+Servidor HTTP local que imita a API de Dados Abertos da Câmara
+
+Serve deputados, proposições, partidos, votações e votos a partir de dados
+sintéticos, com paginação (`pagina`/`itens` e links rel="next"), latência
+configurável, respostas 429 aleatórias com Retry-After e, opcionalmente, um
+limite de taxa no servidor (429 quando excedido).
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEFAULT_PAGE_SIZE = 15
+MAX_PAGE_SIZE = 100
+
+def _records(df):
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+class FakeCamaraApi:
+    """Servidor local com os endpoints usados pelo CamaraApiClient.
+
+    Uso:
+        with FakeCamaraApi(dataset, latency=0.02, rate_limit_probability=0.01) as api:
+            client.base_url = api.base_url
+    """
+
+    def __init__(self, dataset, latency=0.0, rate_limit_probability=0.0, retry_after=1,
+                 host='127.0.0.1', port=0, seed=0, max_rate=None):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        # Limite de requisições por segundo do servidor (token bucket com rajada de 1 s)
+        self.max_rate = max_rate
+        self._tokens = max_rate or 0.0
+        self._tokens_updated = time.monotonic()
+        self.requests_served = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._load(dataset)
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    def _load(self, dataset):
+        self.deputies = _records(dataset['deputados'])
+        self.deputies_by_id = {record['id']: self._deputy_details(record) for record in self.deputies}
+        self.propositions = _records(dataset['proposicoes'])
+        self.parties = [{'id': k, 'sigla': sigla, 'nome': sigla}
+                        for k, sigla in enumerate(sorted(dataset['deputados']['siglaPartido'].unique()))]
+
+        votacoes = dataset['votacoes']
+        self.votacoes_by_proposition = {
+            int(prop_id): _records(group.drop(columns='proposicaoId'))
+            for prop_id, group in votacoes.groupby('proposicaoId')
+        }
+
+        # Votos no formato da API: deputado_ aninhado
+        votos = dataset['votos']
+        self.votos_by_votacao = {}
+        for votacao_id, group in votos.groupby('idVotacao'):
+            self.votos_by_votacao[votacao_id] = [
+                {
+                    'tipoVoto': row.voto,
+                    'dataRegistroVoto': row.dataRegistroVoto,
+                    'deputado_': {
+                        'id': int(row.idDeputado),
+                        'nome': f"Deputado {row.idDeputado}",
+                        'siglaPartido': row.siglaPartido,
+                        'siglaUf': row.siglaUf,
+                        'idLegislatura': 57,
+                    },
+                }
+                for row in group.itertuples(index=False)
+            ]
+
+    @staticmethod
+    def _deputy_details(record):
+        """Registro no formato de deputados/{id} (ultimoStatus e gabinete aninhados)."""
+        office = str(record['id'])[-3:]
+        return {
+            'id': record['id'],
+            'uri': record['uri'],
+            'nomeCivil': record['nome'],
+            'ultimoStatus': {
+                **record,
+                'nomeEleitoral': record['nome'],
+                'gabinete': {'nome': office, 'predio': '4', 'sala': office, 'andar': office[0],
+                             'telefone': f"3215-5{office}", 'email': record['email']},
+                'situacao': 'Exercício',
+                'condicaoEleitoral': 'Titular',
+                'descricaoStatus': None,
+                'data': '2023-02-01T00:00',
+            },
+            'sexo': 'M' if record['id'] % 2 else 'F',
+            'urlWebsite': None,
+            'redeSocial': [],
+            'dataNascimento': '1970-01-01',
+            'dataFalecimento': None,
+            'ufNascimento': record['siglaUf'],
+            'municipioNascimento': 'Brasília',
+            'escolaridade': 'Superior',
+        }
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _route(self, path, query):
+        parts = [part for part in path.split('/') if part]
+        if parts == ['deputados']:
+            return self._paginate(self.deputies, path, query)
+        if len(parts) == 2 and parts[0] == 'deputados':
+            deputy = self.deputies_by_id.get(int(parts[1]))
+            return (200, {'dados': deputy, 'links': []}) if deputy else (404, {'status': 404})
+        if parts == ['proposicoes']:
+            records = self.propositions
+            if 'ano' in query:
+                year = int(query['ano'])
+                records = [record for record in records if record['ano'] == year]
+            if 'dataApresentacaoInicio' in query or 'dataApresentacaoFim' in query:
+                first = query.get('dataApresentacaoInicio', '0000-00-00')
+                last = query.get('dataApresentacaoFim', '9999-99-99') + 'T99'
+                records = [record for record in records if first <= record['dataApresentacao'] <= last]
+            return self._paginate(records, path, query)
+        if parts == ['partidos']:
+            return self._paginate(self.parties, path, query)
+        if len(parts) == 3 and parts[0] == 'proposicoes' and parts[2] == 'votacoes':
+            return 200, {'dados': self.votacoes_by_proposition.get(int(parts[1]), []), 'links': []}
+        if len(parts) == 3 and parts[0] == 'votacoes' and parts[2] == 'votos':
+            return 200, {'dados': self.votos_by_votacao.get(parts[1], []), 'links': []}
+        return 404, {'status': 404, 'title': 'Not Found'}
+
+    def _paginate(self, records, path, query):
+        page = int(query.get('pagina', 1))
+        size = min(int(query.get('itens', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        start = (page - 1) * size
+
+        links = [{'rel': 'self', 'href': f"{self.base_url}{path}?{urlencode(query)}"}]
+        if start + size < len(records):
+            links.append({'rel': 'next',
+                          'href': f"{self.base_url}{path}?{urlencode({**query, 'pagina': page + 1})}"})
+        return 200, {'dados': records[start:start + size], 'links': links}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if api.latency:
+                    time.sleep(api.latency)
+
+                with api._lock:
+                    api.requests_served += 1
+                    throttled = api._random.random() < api.rate_limit_probability
+                    if api.max_rate:
+                        now = time.monotonic()
+                        api._tokens = min(api.max_rate,
+                                          api._tokens + (now - api._tokens_updated) * api.max_rate)
+                        api._tokens_updated = now
+                        if api._tokens >= 1:
+                            api._tokens -= 1
+                        else:
+                            throttled = True
+                    if throttled:
+                        api.rate_limited += 1
+
+                if throttled:
+                    self._send(429, {'status': 429, 'title': 'Too Many Requests'},
+                               {'Retry-After': str(api.retry_after)})
+                    return
+
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, body = api._route(url.path, query)
+                self._send(status, body)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,419 @@
+"""
+Executa os benchmarks e grava os resultados em JSON
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.run_benchmarks --rows 100000 --output bench.json
+    python -m benchmarks.run_benchmarks --rows 1000000 --baseline bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import benchmarks  # registra o pacote utils
+from benchmarks.dados_sinteticos import generate_dataset, write_bulk_files
+from benchmarks.fake_api import FakeCamaraApi
+from utils.api_cliente import CamaraApiClient
+from utils.armazenamento import get_storage
+from utils.limitador import RateLimiter
+from utils.transformacoes import clean_deputies_data, clean_propositions_data, process_votes_data
+from utils.check_qualidade import (ValidationEngine, Unique, check_deputies_data, check_propositions_data,
+                                   check_votes_data)
+from utils.coesao import CohesionEngine
+from utils.consultas import QueryService, mark_published, publish_current
+from utils.esquemas import SCHEMAS, apply_schema, memory_report
+from utils.ingestao_bulk import iter_bulk_frames, normalize_frame
+
+# Módulos que não devem ser carregados na análise da DAG pelo agendador
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'requests', 'psycopg2', 'sqlalchemy')
+
+# Resultado que falha a execução se o arquivo da DAG carregar algum de HEAVY_MODULES
+DAG_FILE_RESULT = 'dag_parse.camara_etl'
+
+# Executado em um processo novo: carrega o Airflow (ou, sem ele, módulos mínimos no lugar) e mede
+# apenas o que o módulo acrescenta
+_IMPORT_SCRIPT = """
+import importlib.util, json, sys, time, types
+class Stub:
+    output = None
+    def __init__(self, *args, **kwargs): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): return False
+    def __rshift__(self, other): return other
+    def __rrshift__(self, other): return self
+    def expand(self, **kwargs): return self
+    @classmethod
+    def partial(cls, *args, **kwargs): return cls()
+def stub_airflow():
+    names = ['airflow', 'airflow.operators', 'airflow.operators.python', 'airflow.operators.dummy',
+             'airflow.utils', 'airflow.utils.dates', 'airflow.providers', 'airflow.providers.postgres',
+             'airflow.providers.postgres.hooks', 'airflow.providers.postgres.hooks.postgres']
+    for name in names:
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules['airflow'].DAG = Stub
+    sys.modules['airflow.operators.python'].PythonOperator = Stub
+    sys.modules['airflow.operators.dummy'].DummyOperator = Stub
+    sys.modules['airflow.utils.dates'].days_ago = lambda n: None
+    sys.modules['airflow.providers.postgres.hooks.postgres'].PostgresHook = Stub
+    return 'stub'
+if sys.argv[4] == 'stub':
+    source = stub_airflow()
+else:
+    try:
+        import airflow, airflow.operators.python, airflow.operators.dummy, airflow.utils.dates
+        source = 'airflow'
+    except ImportError:
+        source = stub_airflow()
+before = set(sys.modules)
+utils = types.ModuleType('utils'); utils.__path__ = [sys.argv[1]]; sys.modules['utils'] = utils
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location(sys.argv[2], sys.argv[3])
+module = importlib.util.module_from_spec(spec); sys.modules[sys.argv[2]] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted(set(sys.modules) - before), 'airflow': source}))
+"""
+
+def import_fresh(module, path, stub_airflow=False):
+    """Importa o arquivo path como module num processo novo, após o Airflow (real ou substituto).
+
+    Retorna o tempo de importação, os módulos que ela carregou e qual Airflow
+    foi usado ('airflow' ou 'stub', quando não instalado ou se stub_airflow).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', _IMPORT_SCRIPT, root, module, path,
+                             'stub' if stub_airflow else 'auto'],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def heavy_modules(modules):
+    """Pacotes de HEAVY_MODULES presentes em uma lista de módulos carregados."""
+    return sorted({loaded.split('.')[0] for loaded in modules} & set(HEAVY_MODULES))
+
+def measure(name, func, rows, repeat=3):
+    """Melhor tempo em `repeat` execuções e pico de memória (tracemalloc) de uma execução."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    result = {
+        'name': name,
+        'rows': rows,
+        'seconds': best,
+        'rows_per_second': rows / best if best else None,
+        'peak_memory_mb': peak / 2 ** 20,
+    }
+    print(f"{name:<40} {rows:>10} linhas  {best:8.4f}s  {result['peak_memory_mb']:9.1f} MB")
+    return result
+
+def bench_transforms(dataset, repeat):
+    deputies = dataset['deputados']
+    propositions = dataset['proposicoes']
+    votacoes = dataset['votacoes']
+    votos = dataset['votos']
+    clean_deputies = clean_deputies_data(deputies)
+    clean_propositions = clean_propositions_data(propositions)
+
+    return [
+        measure('clean_deputies_data', lambda: clean_deputies_data(deputies), len(deputies), repeat),
+        measure('clean_propositions_data', lambda: clean_propositions_data(propositions),
+                len(propositions), repeat),
+        measure('process_votes_data', lambda: process_votes_data(votacoes, votos), len(votos), repeat),
+        measure('CohesionEngine.update', lambda: CohesionEngine().update(votos).per_votacao(),
+                len(votos), repeat),
+        measure('check_deputies_data', lambda: check_deputies_data(clean_deputies), len(deputies), repeat),
+        measure('check_propositions_data', lambda: check_propositions_data(clean_propositions),
+                len(propositions), repeat),
+        measure('check_votes_data', lambda: check_votes_data(votacoes), len(votacoes), repeat),
+    ]
+
+def bench_validation(rows, repeat, chunks=50, seed=0):
+    """Unicidade de `rows` ids validada de uma vez x em `chunks` blocos de uma mesma sessão."""
+    ids = pd.DataFrame({'id': np.random.default_rng(seed).permutation(rows)})
+    engine = ValidationEngine('ids', [Unique('id')])
+    chunk_rows = max(rows // chunks, 1)
+
+    def validate_chunks():
+        return engine.validate_chunks(ids[start:start + chunk_rows] for start in range(0, rows, chunk_rows))
+
+    return [
+        measure('Unique.validate', lambda: engine.validate(ids), rows, repeat),
+        measure(f'Unique.validate_chunks[{chunks}]', validate_chunks, rows, repeat),
+    ]
+
+def bench_schemas(dataset, repeat):
+    """Tempo de apply_schema e memória (deep) de cada conjunto antes/depois dos tipos compactos."""
+    results = []
+    for entity in ['deputados', 'proposicoes', 'votacoes', 'votos']:
+        df = dataset[entity]
+        result = measure(f'apply_schema[{entity}]', lambda: apply_schema(df, SCHEMAS[entity]), len(df), repeat)
+        report = memory_report(df, apply_schema(df, SCHEMAS[entity]))
+        result.update({'memory_before_mb': report.before / 2 ** 20, 'memory_after_mb': report.after / 2 ** 20,
+                       'memory_ratio': report.ratio})
+        print(f"{'':<40} memória {result['memory_before_mb']:9.1f} MB -> {result['memory_after_mb']:7.1f} MB "
+              f"({report.ratio:.1f}x)")
+        results.append(result)
+    return results
+
+def bench_bulk(dataset, repeat):
+    """Leitura do arquivo anual de votos: JSON em fluxo (blocos) x json.load do arquivo inteiro."""
+    rows = len(dataset['votos'])
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = write_bulk_files(dataset, directory, 2023, 'json')['votos']
+        csv_path = write_bulk_files(dataset, directory, 2023, 'csv')['votos']
+
+        def load_whole():
+            with open(json_path, encoding='utf-8') as f:
+                flat = pd.json_normalize(json.load(f)['dados'], sep='_')
+            return normalize_frame(flat.rename(columns=lambda col: col.replace('__', '_')), 'votos')
+
+        def stream(path):
+            return lambda: sum(len(frame) for frame in iter_bulk_frames(path, 'votos'))
+
+        results = []
+        for name, func, path in [('json.load', load_whole, json_path),
+                                 ('json em fluxo', stream(json_path), json_path),
+                                 ('csv em blocos', stream(csv_path), csv_path)]:
+            result = measure(f'bulk_votos[{name}]', func, rows, repeat)
+            result['file_mb'] = os.path.getsize(path) / 2 ** 20
+            results.append(result)
+    return results
+
+def bench_queries(dataset, repeat, workers=8, queries=2000):
+    """Latência da camada de consulta: filtro sem e com cache e consultas concorrentes (p50/p95)."""
+    deputies = clean_deputies_data(dataset['deputados'])
+    propositions = clean_propositions_data(dataset['proposicoes'])
+    rng = np.random.default_rng(0)
+    parties = deputies['siglaPartido'].dropna().unique().tolist()
+    types = propositions['siglaTipo'].dropna().unique().tolist()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = get_storage('parquet', directory)
+        storage.write(deputies, 'processed', 'deputados_processados', '20240101')
+        storage.write(propositions, 'processed', 'proposicoes_processadas', '20240101')
+        publish_current(storage, 'deputados', 'deputados_processados')
+        publish_current(storage, 'proposicoes', 'proposicoes_processadas')
+        mark_published(os.path.join(directory, 'state', 'publicacao.json'))
+        service = QueryService(storage)
+
+        def query(i):
+            where = {'siglaTipo': types[i % len(types)],
+                     'dataApresentacao': (f"{2019 + i % 5}-01-01", f"{2019 + i % 5}-{1 + i % 12:02d}-28")}
+            return service.filter('proposicoes', where)
+
+        def uncached():
+            service.cache.clear()
+            query(0)
+
+        results = [
+            measure('consulta[filtro sem cache]', uncached, len(propositions), repeat),
+            measure('consulta[filtro com cache]', lambda: query(0), len(propositions), repeat),
+        ]
+
+        def timed(i):
+            start = time.perf_counter()
+            if i % 2:
+                query(int(rng.integers(0, 60)))
+            else:
+                service.aggregate('deputados', 'siglaUf', {'siglaPartido': parties[i % len(parties)]})
+            return time.perf_counter() - start
+
+        service.cache.clear()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = np.array(list(executor.map(timed, range(queries))))
+        stats = service.get_stats()
+
+    result = {
+        'name': f'consulta[{workers} threads]',
+        'queries': queries,
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'max_ms': float(latencies.max() * 1000),
+        'cache_hits': stats['hits'],
+        'cache_misses': stats['misses'],
+    }
+    print(f"{result['name']:<40} {queries:>10} consultas  p50 {result['p50_ms']:6.2f} ms  "
+          f"p95 {result['p95_ms']:6.2f} ms  máx {result['max_ms']:6.2f} ms")
+    return results + [result]
+
+def bench_client(latency, rate_limit_probability, workers):
+    """Vazão do cliente contra a API local (paginação e busca concorrente de votações)."""
+    dataset = generate_dataset(20000, max_year=datetime.now().year)
+    results = []
+
+    with FakeCamaraApi(dataset, latency=latency, rate_limit_probability=rate_limit_probability) as api:
+        for name, kwargs, call in [
+            ('client.get_propositions', {}, lambda client: client.get_propositions()),
+            ('client.get_votes_many[1]', {},
+             lambda client: client.get_votes_many(dataset['votacoes']['proposicaoId'].unique()[:200],
+                                                  max_workers=1)),
+            (f'client.get_deputy_details_many[{workers}]', {'pool_size': workers},
+             lambda client: client.get_deputy_details_many(dataset['deputados']['id'], max_workers=workers)),
+            (f'client.get_votes_many[{workers}]', {'pool_size': workers},
+             lambda client: client.get_votes_many(dataset['votacoes']['proposicaoId'].unique()[:200],
+                                                  max_workers=workers)),
+        ]:
+            client = CamaraApiClient(backoff_factor=0.05, **kwargs)
+            client.base_url = api.base_url
+            start = time.perf_counter()
+            call(client)
+            elapsed = time.perf_counter() - start
+            stats = client.get_stats()
+            client.close()
+
+            results.append({
+                'name': name,
+                'requests': stats['requests'],
+                'retries': stats['retries'],
+                'failures': stats['failures'],
+                'seconds': elapsed,
+                'requests_per_second': stats['requests'] / elapsed if elapsed else None,
+            })
+            print(f"{name:<40} {stats['requests']:>10} reqs   {elapsed:8.4f}s  "
+                  f"{stats['retries']:>5} novas tentativas")
+    return results
+
+def bench_rate_limiter(latency, server_rate, workers):
+    """Detalhes de deputados contra um servidor com limite de taxa, sem e com o RateLimiter adaptativo."""
+    dataset = generate_dataset(20000, max_year=datetime.now().year)
+    deputy_ids = dataset['deputados']['id']
+    results = []
+
+    for name, limiter in [
+        (f'rate_limit[{server_rate}/s].sem_limitador', None),
+        (f'rate_limit[{server_rate}/s].limitador', RateLimiter(rate=server_rate, burst=workers,
+                                                                max_rate=server_rate * 2)),
+    ]:
+        with FakeCamaraApi(dataset, latency=latency, retry_after=1, max_rate=server_rate) as api:
+            client = CamaraApiClient(pool_size=workers, backoff_factor=0.05, rate_limiter=limiter)
+            client.base_url = api.base_url
+            start = time.perf_counter()
+            client.get_deputy_details_many(deputy_ids, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            stats = client.get_stats()
+            client.close()
+
+        results.append({
+            'name': name,
+            'requests': stats['requests'],
+            'retries': stats['retries'],
+            'failures': stats['failures'],
+            'seconds': elapsed,
+            'requests_per_second': stats['requests'] / elapsed if elapsed else None,
+        })
+        print(f"{name:<40} {stats['requests']:>10} reqs   {elapsed:8.4f}s  "
+              f"{stats['retries']:>5} novas tentativas {stats['failures']:>5} falhas")
+    return results
+
+def bench_dag_parse(repeat):
+    """Tempo de importação do arquivo da DAG e das tarefas, cada um em um processo novo, além do Airflow.
+
+    camara_etl.py é o que o agendador reanalisa a cada ciclo; utils.tarefas_etl
+    é importado só pelos workers e mostra o custo evitado na análise. Sem o
+    Airflow instalado, módulos substitutos mínimos ocupam o seu lugar.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for name, module, path in [
+        (DAG_FILE_RESULT, 'camara_etl', os.path.join(root, 'camara_etl.py')),
+        ('dag_parse.tarefas_etl', 'utils.tarefas_etl', os.path.join(root, 'tarefas_etl.py')),
+    ]:
+        runs = [import_fresh(module, path) for _ in range(repeat)]
+        best = min(run['seconds'] for run in runs)
+        modules = runs[0]['modules']
+        heavy = heavy_modules(modules)
+        results.append({
+            'name': name,
+            'seconds': best,
+            'modules_loaded': len(modules),
+            'heavy_modules': heavy,
+            'airflow': runs[0]['airflow'],
+        })
+        print(f"{name:<40} {len(modules):>10} módulos {best:8.4f}s  pesados: {', '.join(heavy) or '-'}"
+              f"{'  (Airflow substituto)' if runs[0]['airflow'] == 'stub' else ''}")
+    return results
+
+def compare(results, baseline_path):
+    """Mostra a razão entre os tempos atuais e os de uma execução anterior."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {item['name']: item for item in json.load(f)['results']}
+
+    print(f"\nComparação com {baseline_path} (tempo atual / anterior):")
+    for item in results:
+        previous = baseline.get(item['name'])
+        if previous and previous.get('seconds'):
+            print(f"{item['name']:<40} {item['seconds'] / previous['seconds']:6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline da Câmara")
+    parser.add_argument('--rows', type=int, default=100000,
+                        help="número de votos sintéticos (as demais entidades são proporcionais)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-client', action='store_true', help="não executa os benchmarks do cliente HTTP")
+    parser.add_argument('--latency', type=float, default=0.02, help="latência simulada da API local (s)")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--server-rate', type=float, default=40,
+                        help="limite de req/s da API local no benchmark do limitador de taxa")
+    parser.add_argument('--skip-dag', action='store_true', help="não mede a análise do arquivo da DAG")
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--baseline', help="resultado anterior para comparação")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    dataset = generate_dataset(args.rows, seed=args.seed, max_year=datetime.now().year)
+    results = bench_transforms(dataset, args.repeat)
+    results += bench_validation(args.rows, args.repeat, seed=args.seed)
+    results += bench_schemas(dataset, args.repeat)
+    results += bench_bulk(dataset, args.repeat)
+    results += bench_queries(dataset, args.repeat, args.workers)
+    if not args.skip_client:
+        results += bench_client(args.latency, args.rate_limit_probability, args.workers)
+        results += bench_rate_limiter(args.latency, args.server_rate, args.workers)
+    if not args.skip_dag:
+        results += bench_dag_parse(args.repeat)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'rows': args.rows,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    # O arquivo da DAG deve continuar leve: importações pesadas só dentro das tarefas
+    heavy = next((item['heavy_modules'] for item in results if item['name'] == DAG_FILE_RESULT), [])
+    if heavy:
+        sys.exit(f"camara_etl.py importa módulos pesados na análise da DAG: {', '.join(heavy)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Cache persistente em disco para respostas da API da Câmara
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from fnmatch import fnmatch
+
+logger = logging.getLogger(__name__)
+
+# TTL (segundos) por padrão de endpoint; o primeiro padrão que casar vence
+DEFAULT_TTLS = {
+    'deputados': 12 * 3600,
+    'deputados/*': 7 * 24 * 3600,
+    'partidos': 24 * 3600,
+    'proposicoes': 3600,
+    'proposicoes/*/votacoes': 12 * 3600,
+    'votacoes/*/votos': 30 * 24 * 3600,
+}
+
+@dataclass
+class CacheStats:
+    """Contadores de uso do cache."""
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+class ResponseCache:
+    """Cache de respostas JSON em disco, com TTL por endpoint e despejo LRU por tamanho.
+
+    Cada entrada é um arquivo JSON com o corpo da resposta e os validadores
+    (ETag/Last-Modified) usados para revalidar entradas vencidas com 304.
+    O horário de modificação do arquivo registra o último acesso (LRU).
+    """
+
+    def __init__(self, cache_dir, ttls=None, default_ttl=0, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and entry.name.endswith('.json')]
+
+    def _path(self, endpoint, params):
+        raw = json.dumps([endpoint, sorted((params or {}).items())], default=str)
+        key = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def ttl_for(self, endpoint):
+        """TTL configurado para o endpoint."""
+        for pattern, ttl in self.ttls.items():
+            if fnmatch(endpoint, pattern):
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl_for(entry['endpoint'])
+
+    def get(self, endpoint, params=None):
+        """Retorna a entrada armazenada (fresca ou vencida) ou None."""
+        path = self._path(endpoint, params)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        with self._lock:
+            if self.is_fresh(entry):
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return entry
+
+    @staticmethod
+    def validators(entry):
+        """Cabeçalhos condicionais para revalidar uma entrada vencida."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, endpoint, params, body, etag=None, last_modified=None):
+        """Armazena uma resposta e aplica o limite de tamanho."""
+        entry = {
+            'endpoint': endpoint,
+            'params': params,
+            'stored_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body,
+        }
+        self._write(self._path(endpoint, params), entry)
+        with self._lock:
+            self.stats.stores += 1
+        self._evict()
+
+    def refresh(self, endpoint, params, entry):
+        """Renova uma entrada revalidada pelo servidor (resposta 304)."""
+        entry['stored_at'] = time.time()
+        self._write(self._path(endpoint, params), entry)
+        with self._lock:
+            self.stats.revalidations += 1
+
+    def invalidate(self, endpoint, params=None):
+        """Remove a entrada de um endpoint (a próxima leitura consulta a API)."""
+        path = self._path(endpoint, params)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return False
+            self._size -= size
+        return True
+
+    def _write(self, path, entry):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, default=str)
+
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += os.path.getsize(path) - old_size
+
+    def _evict(self):
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+
+            # Remove as entradas menos usadas recentemente até caber no limite
+            entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+            for entry in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                self._size -= size
+                self.stats.evictions += 1
+
+        logger.info(f"Cache reduzido para {self._size} bytes")
+
+    def get_stats(self):
+        with self._lock:
+            return {**asdict(self.stats), 'size_bytes': self._size}
@@ -0,0 +1,237 @@
+"""
+Carga em massa dos dados processados no PostgreSQL (COPY + upsert via tabela de staging)
+"""
+import io
+import logging
+
+import pandas as pd
+
+from utils.esquemas import to_nullable_int
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = 'camara'
+
+# Linhas por bloco enviado via COPY (limita a memória do buffer)
+COPY_CHUNK_ROWS = 100000
+
+# Definição das tabelas: colunas (nome no DataFrame -> tipo), chave natural e índices
+TABLES = {
+    'deputados': {
+        'columns': {
+            'id': 'BIGINT',
+            'nome': 'TEXT',
+            'siglaPartido': 'TEXT',
+            'siglaUf': 'TEXT',
+            'regiao': 'TEXT',
+            'idLegislatura': 'INTEGER',
+            'email': 'TEXT',
+            'urlFoto': 'TEXT',
+            'uri': 'TEXT',
+            'nomeCivil': 'TEXT',
+            'nomeEleitoral': 'TEXT',
+            'sexo': 'TEXT',
+            'dataNascimento': 'DATE',
+            'ufNascimento': 'TEXT',
+            'municipioNascimento': 'TEXT',
+            'escolaridade': 'TEXT',
+            'situacao': 'TEXT',
+            'condicaoEleitoral': 'TEXT',
+            'gabineteNome': 'TEXT',
+            'gabinetePredio': 'TEXT',
+            'gabineteSala': 'TEXT',
+            'gabineteAndar': 'TEXT',
+            'gabineteTelefone': 'TEXT',
+            'gabineteEmail': 'TEXT',
+            'redeSocial': 'TEXT',
+            'data_processamento': 'TIMESTAMP',
+        },
+        'key': ['id'],
+        'indexes': [['siglaPartido'], ['siglaUf'], ['regiao']],
+    },
+    'proposicoes': {
+        'columns': {
+            'id': 'BIGINT',
+            'siglaTipo': 'TEXT',
+            'codTipo': 'INTEGER',
+            'numero': 'INTEGER',
+            'ano': 'INTEGER',
+            'ementa': 'TEXT',
+            'dataApresentacao': 'TIMESTAMP',
+            'anoApresentacao': 'INTEGER',
+            'identificacao': 'TEXT',
+            'uri': 'TEXT',
+            'data_processamento': 'TIMESTAMP',
+        },
+        'key': ['id'],
+        'indexes': [['siglaTipo'], ['ano'], ['dataApresentacao']],
+    },
+    'votacoes': {
+        'columns': {
+            'id': 'TEXT',
+            'proposicaoId': 'BIGINT',
+            'data': 'DATE',
+            'dataHoraRegistro': 'TIMESTAMP',
+            'siglaOrgao': 'TEXT',
+            'proposicaoObjeto': 'TEXT',
+            'descricao': 'TEXT',
+            'aprovacao': 'INTEGER',
+            'uri': 'TEXT',
+        },
+        'key': ['id'],
+        'indexes': [['proposicaoId'], ['data']],
+    },
+    'votos': {
+        'columns': {
+            'idVotacao': 'TEXT',
+            'idDeputado': 'BIGINT',
+            'siglaPartido': 'TEXT',
+            'siglaUf': 'TEXT',
+            'voto': 'TEXT',
+            'dataRegistroVoto': 'TIMESTAMP',
+        },
+        'key': ['idVotacao', 'idDeputado'],
+        'indexes': [['idDeputado'], ['siglaPartido', 'idVotacao']],
+    },
+}
+
+INTEGER_TYPES = ('INTEGER', 'BIGINT')
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+def _columns_sql(columns):
+    return ', '.join(_quote(col) for col in columns)
+
+def create_table_sql(table):
+    spec = TABLES[table]
+    columns = ',\n    '.join(f"{_quote(col)} {pg_type}" for col, pg_type in spec['columns'].items())
+    return (f"CREATE TABLE IF NOT EXISTS {SCHEMA}.{_quote(table)} (\n    {columns},\n"
+            f"    PRIMARY KEY ({_columns_sql(spec['key'])})\n)")
+
+def create_indexes_sql(table):
+    statements = []
+    for columns in TABLES[table]['indexes']:
+        name = f"idx_{table}_{'_'.join(columns)}".lower()
+        statements.append(f"CREATE INDEX IF NOT EXISTS {_quote(name)} "
+                          f"ON {SCHEMA}.{_quote(table)} ({_columns_sql(columns)})")
+    return statements
+
+def add_columns_sql(table):
+    """Colunas novas em tabelas já existentes (criadas por versões anteriores)."""
+    return [f"ALTER TABLE {SCHEMA}.{_quote(table)} ADD COLUMN IF NOT EXISTS {_quote(col)} {pg_type}"
+            for col, pg_type in TABLES[table]['columns'].items() if col not in TABLES[table]['key']]
+
+def ensure_schema(conn):
+    """Cria schema, tabelas e índices usados pelas consultas do dashboard, se não existirem."""
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        for table in TABLES:
+            cursor.execute(create_table_sql(table))
+            for statement in add_columns_sql(table) + create_indexes_sql(table):
+                cursor.execute(statement)
+    conn.commit()
+
+def _prepare(df, table):
+    """Seleciona as colunas da tabela e ajusta tipos para o COPY."""
+    spec = TABLES[table]
+    columns = [col for col in spec['columns'] if col in df.columns]
+    missing_key = [col for col in spec['key'] if col not in columns]
+    if missing_key:
+        raise ValueError(f"Colunas da chave ausentes para {table}: {missing_key}")
+
+    prepared = df[columns].copy(deep=False)
+    for col in columns:
+        # Inteiros com nulos chegam como float (ex.: 123.0); o COPY exige 123. Valores não
+        # inteiros (ex.: 1.5) viram nulos, como na aplicação dos esquemas
+        if spec['columns'][col] in INTEGER_TYPES and not pd.api.types.is_integer_dtype(prepared[col]):
+            prepared[col] = to_nullable_int(prepared[col])
+    return prepared.drop_duplicates(subset=spec['key'], keep='last'), columns
+
+def _iter_csv_buffers(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        buffer = io.StringIO()
+        df.iloc[start:start + chunk_rows].to_csv(buffer, index=False, header=False,
+                                                 date_format='%Y-%m-%d %H:%M:%S')
+        buffer.seek(0)
+        yield buffer
+
+def upsert_dataframe(conn, table, df, chunk_rows=COPY_CHUNK_ROWS):
+    """Carrega df em table: COPY para uma tabela temporária e upsert pela chave natural.
+
+    `conn` é uma conexão psycopg2 (ex.: PostgresHook.get_conn()). Retorna o número de linhas enviadas.
+    """
+    if df is None or df.empty:
+        logger.warning(f"Nada a carregar em {table}")
+        return 0
+    return upsert_frames(conn, table, [df], chunk_rows)
+
+def upsert_frames(conn, table, frames, chunk_rows=COPY_CHUNK_ROWS):
+    """Carrega uma sequência de DataFrames em table, um bloco por vez, numa única transação.
+
+    Cada bloco passa por COPY para a tabela temporária e pelo upsert antes do
+    próximo ser lido, de modo que a memória acompanha o tamanho do bloco (ex.:
+    storage.iter_read). Chaves repetidas entre blocos ficam com o último valor.
+    Retorna o número de linhas enviadas.
+    """
+    spec = TABLES[table]
+    target = f"{SCHEMA}.{_quote(table)}"
+    staging = _quote(f"staging_{table}")
+    sent = affected = 0
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+        for df in frames:
+            if df is None or df.empty:
+                continue
+            prepared, columns = _prepare(df, table)
+            column_list = _columns_sql(columns)
+            updates = [col for col in columns if col not in spec['key']]
+            if updates:
+                conflict = "DO UPDATE SET " + ', '.join(f"{_quote(col)} = EXCLUDED.{_quote(col)}" for col in updates)
+            else:
+                conflict = "DO NOTHING"
+
+            for buffer in _iter_csv_buffers(prepared, chunk_rows):
+                cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {staging} "
+                f"ON CONFLICT ({_columns_sql(spec['key'])}) {conflict}"
+            )
+            affected += cursor.rowcount
+            cursor.execute(f"TRUNCATE {staging}")
+            sent += len(prepared)
+    conn.commit()
+
+    if not sent:
+        logger.warning(f"Nada a carregar em {table}")
+    else:
+        logger.info(f"{sent} linhas enviadas para {target} ({affected} inseridas/atualizadas)")
+    return sent
+
+def delete_rows(conn, table, keys_df, chunk_rows=COPY_CHUNK_ROWS):
+    """Remove de table as linhas cujas chaves naturais estão em keys_df (ex.: exclusões do CDC).
+
+    Retorna o número de linhas removidas.
+    """
+    if keys_df is None or keys_df.empty:
+        return 0
+
+    spec = TABLES[table]
+    prepared, columns = _prepare(keys_df[spec['key']], table)
+    target = f"{SCHEMA}.{_quote(table)}"
+    staging = _quote(f"staging_{table}_exclusoes")
+    column_list = _columns_sql(columns)
+    matches = ' AND '.join(f"t.{_quote(col)} = s.{_quote(col)}" for col in spec['key'])
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                       f"SELECT {column_list} FROM {target} WITH NO DATA")
+        for buffer in _iter_csv_buffers(prepared, chunk_rows):
+            cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(f"DELETE FROM {target} t USING {staging} s WHERE {matches}")
+        affected = cursor.rowcount
+    conn.commit()
+
+    logger.info(f"{affected} linhas removidas de {target}")
+    return affected
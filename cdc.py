@@ -0,0 +1,206 @@
+"""
+Captura de alterações (CDC) entre snapshots e histórico SCD2
+
+Cada snapshot (ex.: lista de deputados do dia) é comparado ao índice de
+hashes de conteúdo por chave natural da execução anterior, gerando apenas
+inclusões (I), alterações (U) e exclusões (D). As alterações de cada
+execução são gravadas como um log de eventos particionado pelo carimbo da
+execução; o histórico SCD2 (valido_de/valido_ate) é montado a partir desse
+log, sem regravar versões antigas a cada dia.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INSERT, UPDATE, DELETE = 'I', 'U', 'D'
+
+# Colunas acrescentadas aos eventos de alteração
+OPERATION = 'operacao'
+CHANGED_AT = 'alterado_em'
+HASH = 'hash'
+CDC_COLUMNS = [OPERATION, CHANGED_AT, HASH]
+
+def content_hash(df, columns=None):
+    """Hash (int64) do conteúdo de cada linha, independente da ordem das colunas."""
+    columns = sorted(columns if columns is not None else [col for col in df.columns if col not in CDC_COLUMNS])
+    hashes = pd.util.hash_pandas_object(df.reindex(columns=columns), index=False).to_numpy()
+    return hashes.view(np.int64)
+
+def _keys(series):
+    """Chaves comparáveis entre snapshots (inteiros como int64, demais como texto)."""
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series):
+        return pd.Index(series.to_numpy(dtype='int64', na_value=-1))
+    return pd.Index(series.astype(str).to_numpy())
+
+@dataclass
+class ChangeSet:
+    """Resultado da comparação de um snapshot com o índice anterior."""
+    inserts: pd.DataFrame
+    updates: pd.DataFrame
+    deletes: pd.DataFrame
+    index: pd.DataFrame
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def events(self, changed_at=None):
+        """Log de eventos: registros incluídos/alterados completos e chaves excluídas."""
+        changed_at = changed_at or datetime.now()
+        frames = [df.assign(**{OPERATION: operation})
+                  for df, operation in [(self.inserts, INSERT), (self.updates, UPDATE), (self.deletes, DELETE)]
+                  if not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=list(self.inserts.columns) + CDC_COLUMNS)
+        events = pd.concat(frames, ignore_index=True)
+        events[CHANGED_AT] = changed_at
+        return events
+
+    def summary(self):
+        return {'inclusoes': len(self.inserts), 'alteracoes': len(self.updates), 'exclusoes': len(self.deletes)}
+
+def diff_snapshot(index, df, key='id', columns=None, deletes=True):
+    """Compara o snapshot df com o índice (chave, hash) da execução anterior.
+
+    Com deletes=False (snapshots parciais, ex.: proposições de um ano), chaves
+    ausentes do snapshot não são excluídas e continuam no índice.
+    """
+    current = df.dropna(subset=[key]).drop_duplicates(subset=key, keep='last').reset_index(drop=True)
+    current[HASH] = content_hash(current, columns)
+    current_keys = _keys(current[key])
+
+    if index is None or index.empty:
+        previous_keys = pd.Index([], dtype=current_keys.dtype)
+        previous_hashes = np.empty(0, dtype=np.int64)
+    else:
+        previous_keys = _keys(index[key])
+        previous_hashes = index[HASH].to_numpy(dtype=np.int64)
+
+    positions = previous_keys.get_indexer(current_keys)
+    known = positions >= 0
+    changed = np.zeros(len(current), dtype=bool)
+    changed[known] = previous_hashes[positions[known]] != current[HASH].to_numpy()[known]
+    inserts = current[~known]
+    updates = current[changed]
+
+    removed = ~previous_keys.isin(current_keys)
+    if deletes and index is not None:
+        deleted = index.loc[removed, [key, HASH]].reset_index(drop=True)
+        new_index = current[[key, HASH]]
+    else:
+        deleted = pd.DataFrame(columns=[key, HASH])
+        kept = index.loc[removed, [key, HASH]] if index is not None and not index.empty else None
+        new_index = pd.concat([kept, current[[key, HASH]]], ignore_index=True) if kept is not None \
+            else current[[key, HASH]]
+
+    changes = ChangeSet(inserts.reset_index(drop=True), updates.reset_index(drop=True), deleted,
+                        new_index.reset_index(drop=True))
+    logger.info(f"CDC: {changes.summary()} em {len(current)} registros do snapshot")
+    return changes
+
+def scd2_history(events, key='id', columns=None):
+    """Histórico SCD2 a partir do log de eventos: uma linha por versão com valido_de, valido_ate e atual.
+
+    Com columns (ex.: ['siglaPartido']), versões consecutivas com os mesmos
+    valores nessas colunas são unidas, de modo que o histórico registra apenas
+    as mudanças de interesse (ex.: trocas de partido).
+    """
+    if events is None or events.empty:
+        return pd.DataFrame(columns=[key] + (columns or []) + ['valido_de', 'valido_ate', 'atual'])
+
+    events = events.sort_values([key, CHANGED_AT], kind='stable').reset_index(drop=True)
+    events[CHANGED_AT] = pd.to_datetime(events[CHANGED_AT])
+    tracked = content_hash(events, columns) if columns is not None else events[HASH].to_numpy()
+    deleted = (events[OPERATION] == DELETE).to_numpy()
+    tracked = np.where(deleted, 0, tracked)
+
+    # Versão nova: primeira linha da chave ou conteúdo diferente do evento anterior
+    keys = _keys(events[key]).to_numpy()
+    same_key = np.r_[False, keys[1:] == keys[:-1]]
+    starts = ~same_key | (tracked != np.roll(tracked, 1)) | np.roll(deleted, 1)
+    versions = events[starts].copy()
+
+    keys = keys[starts]
+    next_same_key = np.r_[keys[:-1] == keys[1:], False]
+    versions['valido_de'] = versions[CHANGED_AT]
+    versions['valido_ate'] = versions[CHANGED_AT].shift(-1).where(next_same_key)
+    versions = versions[versions[OPERATION] != DELETE]
+    versions['atual'] = versions['valido_ate'].isna()
+
+    output = [key] + (columns if columns is not None else
+                      [col for col in events.columns if col not in CDC_COLUMNS and col != key])
+    return versions[output + ['valido_de', 'valido_ate', 'atual']].reset_index(drop=True)
+
+class ChangeCapture:
+    """CDC de uma entidade sobre a camada de armazenamento.
+
+    - índice de hashes: state/cdc/{entidade} (uma versão por carimbo de execução);
+    - log de eventos: raw/{entidade}_alteracoes (uma partição por carimbo).
+
+    Uso:
+        cdc = ChangeCapture(storage, 'deputados')
+        changes, location = cdc.capture(snapshot_df, stamp, committed)
+        ...  # etapas seguintes sobre o delta
+        cdc.commit(stamp, committed)  # ao fim da execução bem-sucedida
+        cdc.history(stamp, ['siglaPartido'])  # versões confirmadas (trocas de partido)
+    """
+
+    def __init__(self, storage, entity, key='id', deletes=True):
+        self.storage = storage
+        self.entity = entity
+        self.key = key
+        self.deletes = deletes
+
+    @property
+    def events_entity(self):
+        return f"{self.entity}_alteracoes"
+
+    def _index_location(self, stamp):
+        return self.storage.location('state', f"cdc/{self.entity}", stamp)
+
+    def load_index(self, committed):
+        """Índice da última execução confirmada (None na primeira execução)."""
+        if not committed:
+            return None
+        location = self._index_location(committed)
+        return self.storage.read(location) if self.storage.exists(location) else None
+
+    def capture(self, df, stamp, committed=None):
+        """Compara df com o índice confirmado e grava o novo índice e os eventos (se houver).
+
+        Retorna (ChangeSet, local dos eventos ou None se nada mudou).
+        """
+        changes = diff_snapshot(self.load_index(committed), df, self.key, deletes=self.deletes)
+        self.storage.write(changes.index, 'state', f"cdc/{self.entity}", stamp)
+        if not len(changes):
+            return changes, None
+        location = self.storage.write(changes.events(datetime.strptime(stamp, '%Y%m%d%H%M%S')),
+                                      'raw', self.events_entity, stamp)
+        return changes, location
+
+    def commit(self, stamp, committed=None):
+        """Confirma a execução `stamp`: remove o índice anterior e eventos de execuções não confirmadas."""
+        for partition_stamp, location in self.storage.partitions('raw', self.events_entity):
+            if (committed or '') < partition_stamp < stamp:
+                self.storage.delete(location)
+        for partition_stamp, location in self.storage.partitions('state', f"cdc/{self.entity}"):
+            if partition_stamp < stamp:
+                self.storage.delete(location)
+
+    def history(self, committed, columns=None, until=None):
+        """Histórico SCD2 a partir dos eventos confirmados (carimbos até `until`).
+
+        committed: carimbo da última execução confirmada (o mesmo passado a
+        capture/commit). Eventos de execuções posteriores, ainda não
+        confirmadas ou que falharam, são ignorados.
+        """
+        last = min(committed, until) if committed and until else committed
+        frames = [self.storage.read(location)
+                  for partition_stamp, location in self.storage.partitions('raw', self.events_entity)
+                  if last and partition_stamp <= last]
+        events = pd.concat(frames, ignore_index=True) if frames else None
+        return scd2_history(events, self.key, columns)
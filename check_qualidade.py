@@ -1,112 +1,276 @@
 import pandas as pd
+import numpy as np
+import json
 import logging
+from dataclasses import dataclass, field
+
+from utils.metricas import get_recorder
 
 logger = logging.getLogger(__name__)
 
-def check_deputies_data(df):
-   
+VALID_STATES = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 
+                'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE', 'PI', 'PR', 
+                'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+
+# Regras de validação. Cada regra de linha devolve uma máscara booleana
+# (vetorizada) com as linhas que a violam.
+
+@dataclass
+class RequiredColumns:
+    columns: list
+    name: str = 'colunas_obrigatorias'
+
+    def missing(self, df):
+        return [col for col in self.columns if col not in df.columns]
+
+@dataclass
+class NotNull:
+    columns: list
+    name: str = 'nulos'
+
+    def mask(self, df, state):
+        return df[self.columns].isnull().any(axis=1)
+
+    def details(self, df, mask):
+        counts = df.loc[mask, self.columns].isnull().sum()
+        return {col: int(count) for col, count in counts.items() if count > 0}
+
+@dataclass
+class Unique:
+    column: str
+    name: str = 'unicidade'
+
+    def mask(self, df, state):
+        # Índice incremental (ordenado) dos hashes já vistos, para validar em blocos
+        key = (self.name, self.column)
+        hashes = pd.util.hash_pandas_object(df[self.column], index=False).to_numpy()
+        seen = state.get(key, np.empty(0, dtype=np.uint64))
+        # Busca binária no índice ordenado
+        positions = np.searchsorted(seen, hashes).clip(max=max(len(seen) - 1, 0))
+        found = seen[positions] == hashes if len(seen) else np.zeros(len(hashes), dtype=bool)
+        mask = pd.Series(found, index=df.index) | df[self.column].duplicated()
+        # Só os hashes novos (ordenados) são intercalados no índice, em uma passagem
+        # linear: o índice acumulado não é reordenado a cada bloco
+        new = np.unique(hashes[~found])
+        state[key] = np.insert(seen, np.searchsorted(seen, new), new)
+        return mask
+
+    def details(self, df, mask):
+        return {'valores': df.loc[mask, self.column].unique().tolist()[:20]}
+
+@dataclass
+class Domain:
+    column: str
+    values: list
+    allow_null: bool = False
+    name: str = 'dominio'
+
+    def mask(self, df, state):
+        mask = ~df[self.column].isin(self.values)
+        if self.allow_null:
+            mask &= df[self.column].notnull()
+        return mask
+
+    def details(self, df, mask):
+        return {'valores': df.loc[mask, self.column].unique().tolist()[:20]}
+
+@dataclass
+class Range:
+    column: str
+    min_value: object = None
+    max_value: object = None
+    name: str = 'intervalo'
+
+    def mask(self, df, state):
+        # Limites podem ser funções (ex.: ano corrente), avaliadas a cada validação
+        min_value = self.min_value() if callable(self.min_value) else self.min_value
+        max_value = self.max_value() if callable(self.max_value) else self.max_value
+        values = df[self.column]
+        mask = pd.Series(False, index=df.index)
+        # Comparações com inteiros anuláveis devolvem NA para nulos (não são violações)
+        if min_value is not None:
+            mask |= (values < min_value).fillna(False).astype(bool)
+        if max_value is not None:
+            mask |= (values > max_value).fillna(False).astype(bool)
+        return mask
+
+    def details(self, df, mask):
+        return {'valores': df.loc[mask, self.column].unique().tolist()[:20]}
+
+@dataclass
+class RuleResult:
+    rule: str
+    columns: list
+    violations: int = 0
+    details: dict = field(default_factory=dict)
+    sample: list = field(default_factory=list)
+
+@dataclass
+class ValidationReport:
+    dataset: str
+    rows: int
+    results: list
+
+    @property
+    def passed(self):
+        return self.rows > 0 and all(result.violations == 0 for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if result.violations]
+
+    def to_dict(self):
+        return {
+            'dataset': self.dataset,
+            'rows': self.rows,
+            'passed': self.passed,
+            'results': [vars(result) for result in self.results],
+        }
+
+    def log(self):
+        for result in self.failures:
+            logger.error(f"[{self.dataset}] regra {result.rule} {result.columns}: "
+                         f"{result.violations} violações {result.details}")
+        if self.passed:
+            logger.info(f"Verificação de qualidade dos dados de {self.dataset}: PASSOU")
+
+class ValidationSession:
+    """Acumula a validação de um conjunto lido em blocos."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.rows = 0
+        self.state = {}
+        self.results = {}
+
+    def _result(self, key, rule, columns):
+        if key not in self.results:
+            self.results[key] = RuleResult(rule.name, columns)
+        return self.results[key]
+
+    def update(self, df):
+        with get_recorder().stage('check', rows_in=len(df)) as stage:
+            self._update(df)
+            stage.rows_out = len(df)
+        return self
+
+    def _update(self, df):
+        sample_size = self.engine.sample_size
+        offset = self.rows
+        self.rows += len(df)
+
+        skipped = set()
+        for rule in self.engine.rules:
+            if isinstance(rule, RequiredColumns):
+                missing = rule.missing(df)
+                result = self._result(id(rule), rule, rule.columns)
+                if missing and not result.violations:
+                    result.violations = len(missing)
+                    result.details = {'faltando': missing}
+                skipped.update(missing)
+                continue
+
+            columns = rule.columns if isinstance(rule, NotNull) else [rule.column]
+            result = self._result(id(rule), rule, columns)
+            if skipped.intersection(columns) or any(col not in df.columns for col in columns):
+                continue
+
+            mask = rule.mask(df, self.state)
+            count = int(mask.sum())
+            if not count:
+                continue
+
+            result.violations += count
+            for key, value in rule.details(df, mask).items():
+                if isinstance(value, list):
+                    # Lista de valores distintos, limitada a 20 por regra
+                    known = result.details.setdefault(key, [])
+                    known.extend(v for v in value if v not in known)
+                    del known[20:]
+                else:
+                    result.details[key] = result.details.get(key, 0) + value
+
+            if len(result.sample) < sample_size:
+                offending = df[mask.to_numpy()].head(sample_size - len(result.sample))
+                records = json.loads(offending.to_json(orient='records', date_format='iso'))
+                positions = offset + np.flatnonzero(mask.to_numpy())[:len(records)]
+                for position, record in zip(positions, records):
+                    record['_linha'] = int(position)
+                result.sample.extend(records)
+        return self
+
+    def report(self):
+        results = [self.results[id(rule)] for rule in self.engine.rules if id(rule) in self.results]
+        return ValidationReport(self.engine.dataset, self.rows, results)
+
+class ValidationEngine:
+    """Motor de validação declarativo: avalia todas as regras e reporta todas as violações."""
+
+    def __init__(self, dataset, rules, sample_size=5):
+        self.dataset = dataset
+        self.rules = rules
+        self.sample_size = sample_size
+
+    def session(self):
+        return ValidationSession(self)
+
+    def validate(self, df):
+        return self.session().update(df).report()
+
+    def validate_chunks(self, chunks):
+        """Valida um conjunto maior que a memória, bloco a bloco (ex.: read_csv com chunksize)."""
+        session = self.session()
+        for chunk in chunks:
+            session.update(chunk)
+        return session.report()
+
+DEPUTIES_VALIDATOR = ValidationEngine('deputados', [
+    RequiredColumns(['id', 'nome', 'siglaPartido', 'siglaUf']),
+    NotNull(['id', 'nome']),
+    Unique('id'),
+    Domain('siglaUf', VALID_STATES),
+])
+
+PROPOSITIONS_VALIDATOR = ValidationEngine('proposições', [
+    RequiredColumns(['id', 'siglaTipo', 'numero', 'ano']),
+    NotNull(['id', 'siglaTipo', 'numero']),
+    Unique('id'),
+    Range('ano', 1900, lambda: pd.Timestamp.now().year),
+])
+
+VOTES_VALIDATOR = ValidationEngine('votações', [
+    RequiredColumns(['id', 'data', 'proposicaoObjeto']),
+    NotNull(['id']),
+])
+
+VOTE_VALUES = ['Sim', 'Não', 'Abstenção', 'Obstrução', 'Artigo 17']
+
+VOTE_DETAILS_VALIDATOR = ValidationEngine('votos', [
+    RequiredColumns(['idVotacao', 'idDeputado', 'siglaPartido', 'voto']),
+    NotNull(['idVotacao', 'idDeputado', 'voto']),
+    Domain('voto', VOTE_VALUES),
+])
+
+def _check(df, validator, label):
     if df is None or df.empty:
-        logger.error("DataFrame de deputados vazio ou None")
+        logger.error(f"DataFrame de {label} vazio ou None")
         return False
-    
-    required_columns = ['id', 'nome', 'siglaPartido', 'siglaUf']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    
-    if missing_columns:
-        logger.error(f"Colunas obrigatórias faltando: {missing_columns}")
-        return False
-    
-    critical_fields = ['id', 'nome']
-    null_counts = df[critical_fields].isnull().sum()
-    
-    if null_counts.sum() > 0:
-        logger.error(f"Campos críticos com valores nulos: {null_counts[null_counts > 0].to_dict()}")
-        return False
-    
-    duplicate_ids = df[df.duplicated('id')]['id'].tolist()
-    
-    if duplicate_ids:
-        logger.error(f"IDs duplicados encontrados: {duplicate_ids}")
-        return False
-    
-    valid_states = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 
-                   'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE', 'PI', 'PR', 
-                   'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
-    
-    invalid_states = df[~df['siglaUf'].isin(valid_states)]['siglaUf'].unique().tolist()
-    
-    if invalid_states:
-        logger.error(f"Estados inválidos encontrados: {invalid_states}")
-        return False
-    
-    logger.info("Verificação de qualidade dos dados de deputados: PASSOU")
-    return True
+
+    report = validator.validate(df)
+    report.log()
+    return report.passed
+
+def check_deputies_data(df):
+    return _check(df, DEPUTIES_VALIDATOR, 'deputados')
 
 def check_propositions_data(df):
-    
-    if df is None or df.empty:
-        logger.error("DataFrame de proposições vazio ou None")
-        return False
-    
-    
-    required_columns = ['id', 'siglaTipo', 'numero', 'ano']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    
-    if missing_columns:
-        logger.error(f"Colunas obrigatórias faltando: {missing_columns}")
-        return False
-    
-    
-    critical_fields = ['id', 'siglaTipo', 'numero']
-    null_counts = df[critical_fields].isnull().sum()
-    
-    if null_counts.sum() > 0:
-        logger.error(f"Campos críticos com valores nulos: {null_counts[null_counts > 0].to_dict()}")
-        return False
-    
-    
-    duplicate_ids = df[df.duplicated('id')]['id'].tolist()
-    
-    if duplicate_ids:
-        logger.error(f"IDs duplicados encontrados: {duplicate_ids}")
-        return False
-    
-    
-    current_year = pd.Timestamp.now().year
-    invalid_years = df[(df['ano'] < 1900) | (df['ano'] > current_year)]['ano'].unique().tolist()
-    
-    if invalid_years:
-        logger.error(f"Anos inválidos encontrados: {invalid_years}")
-        return False
-    
-    logger.info("Verificação de qualidade dos dados de proposições: PASSOU")
-    return True
+    return _check(df, PROPOSITIONS_VALIDATOR, 'proposições')
 
 def check_votes_data(df):
-   
-    if df is None or df.empty:
-        logger.error("DataFrame de votações vazio ou None")
-        return False
-    
-    
-    required_columns = ['id', 'data', 'proposicaoObjeto']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    
-    if missing_columns:
-        logger.error(f"Colunas obrigatórias faltando: {missing_columns}")
-        return False
-    
-    
-    critical_fields = ['id']
-    if 'critical_fields' in df.columns:
-        null_counts = df[critical_fields].isnull().sum()
-        
-        if null_counts.sum() > 0:
-            logger.error(f"Campos críticos com valores nulos: {null_counts[null_counts > 0].to_dict()}")
-            return False
-    
-    logger.info("Verificação de qualidade dos dados de votações: PASSOU")
-    return True
+    return _check(df, VOTES_VALIDATOR, 'votações')
+
+def check_vote_details_data(df):
+    return _check(df, VOTE_DETAILS_VALIDATOR, 'votos')
 
 def check_analytical_view(df):
     
@@ -0,0 +1,254 @@
+"""
+Motor de coesão partidária e alinhamento ao governo sobre votos individuais
+
+Partidos, deputados, votações e valores de voto são codificados como inteiros
+e as contagens são agregadas com NumPy (bincount), o que mantém o custo linear
+no número de votos. O estado é incremental: novas votações são somadas às
+contagens já existentes e podem ser persistidas entre execuções.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+VOTE_VALUES = ['Sim', 'Não', 'Abstenção', 'Obstrução', 'Artigo 17', 'Outro']
+SIM, NAO = 0, 1
+OTHER = len(VOTE_VALUES) - 1
+
+# Partido usado quando o voto não informa a sigla
+NO_PARTY = 'S.PART.'
+
+# Bloco que representa a orientação do governo em votacoes/{id}/orientacoes
+GOVERNMENT_BLOCK = 'Governo'
+
+def encode_votes(values):
+    """Codifica valores de voto como int8 (valores desconhecidos viram OTHER)."""
+    codes = pd.Categorical(values, categories=VOTE_VALUES[:OTHER]).codes.astype(np.int8)
+    codes[codes < 0] = OTHER
+    return codes
+
+class Vocabulary:
+    """Mapeamento incremental valor -> código inteiro."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._index = pd.Index(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, series):
+        """Códigos dos valores já conhecidos (-1 para desconhecidos ou nulos)."""
+        codes, uniques = pd.factorize(series)
+        mapped = self._index.get_indexer(uniques)
+        return np.where(codes >= 0, mapped[codes], -1)
+
+    def encode(self, series):
+        """Códigos dos valores, registrando os novos ao final do vocabulário."""
+        codes, uniques = pd.factorize(series)
+        mapped = self._index.get_indexer(uniques)
+        new_values = [value for value, code in zip(uniques, mapped) if code < 0]
+        if new_values:
+            self.values.extend(new_values)
+            self._index = pd.Index(self.values)
+            mapped = self._index.get_indexer(uniques)
+        return np.where(codes >= 0, mapped[codes], -1)
+
+class CohesionEngine:
+    """Métricas de coesão por votação, partido e deputado.
+
+    Uso:
+        engine = CohesionEngine()
+        engine.update(votos_df, orientacoes_df)
+        engine.per_votacao(); engine.per_party(); engine.per_deputy()
+
+    `votos_df` tem idVotacao, idDeputado, siglaPartido, voto (e opcionalmente
+    dataRegistroVoto). `orientacoes_df` tem idVotacao, siglaPartidoBloco e
+    orientacaoVoto. Cada votação é contabilizada uma única vez: linhas de
+    votações já processadas são ignoradas.
+    """
+
+    def __init__(self):
+        self.votacoes = Vocabulary()
+        self.parties = Vocabulary()
+        self.deputies = Vocabulary()
+        k = len(VOTE_VALUES)
+        self._counts = np.zeros((0, 0, k), dtype=np.int32)
+        self._dates = np.empty(0, dtype='datetime64[ns]')
+        self._government = np.empty(0, dtype=np.int8)
+        self._deputy_party = np.empty(0, dtype=np.int32)
+        self._deputy_stats = np.zeros((0, 4), dtype=np.int64)  # total, com o partido, com orientação do governo, com o governo
+
+    def _grow(self):
+        n_votacoes, n_parties, n_deputies = len(self.votacoes), len(self.parties), len(self.deputies)
+        v, p, _ = self._counts.shape
+        if n_votacoes > v or n_parties > p:
+            self._counts = np.pad(self._counts, ((0, n_votacoes - v), (0, n_parties - p), (0, 0)))
+            self._dates = np.concatenate([self._dates, np.full(n_votacoes - v, np.datetime64('NaT'), 'datetime64[ns]')])
+            self._government = np.concatenate([self._government, np.full(n_votacoes - v, -1, np.int8)])
+        d = len(self._deputy_party)
+        if n_deputies > d:
+            self._deputy_party = np.concatenate([self._deputy_party, np.full(n_deputies - d, -1, np.int32)])
+            self._deputy_stats = np.concatenate([self._deputy_stats, np.zeros((n_deputies - d, 4), np.int64)])
+
+    def update_orientations(self, orientations_df):
+        """Registra a orientação do governo (Sim/Não) das votações conhecidas."""
+        if orientations_df is None or orientations_df.empty:
+            return
+        government = orientations_df[orientations_df['siglaPartidoBloco'] == GOVERNMENT_BLOCK]
+        codes = self.votacoes.lookup(government['idVotacao'])
+        orientation = encode_votes(government['orientacaoVoto'])
+        valid = (codes >= 0) & ((orientation == SIM) | (orientation == NAO))
+        self._government[codes[valid]] = orientation[valid]
+
+    def update(self, votes_df, orientations_df=None):
+        """Incorpora votos de novas votações (e, opcionalmente, as orientações do governo)."""
+        votes_df = votes_df.dropna(subset=['idVotacao', 'idDeputado'])
+        first_new = len(self.votacoes)
+        v_codes = self.votacoes.encode(votes_df['idVotacao'])
+        new_rows = v_codes >= first_new
+        if not new_rows.all():
+            logger.info(f"{int((~new_rows).sum())} votos de votações já processadas ignorados")
+            votes_df = votes_df[new_rows]
+            v_codes = v_codes[new_rows]
+        if votes_df.empty:
+            self._grow()
+            self.update_orientations(orientations_df)
+            return self
+
+        parties = votes_df['siglaPartido']
+        if parties.isnull().any():
+            parties = parties.astype(object).fillna(NO_PARTY)
+        p_codes = self.parties.encode(parties)
+        d_codes = self.deputies.encode(votes_df['idDeputado'])
+        k_codes = encode_votes(votes_df['voto'])
+        self._grow()
+        self.update_orientations(orientations_df)
+
+        # Contagens (votação, partido, voto) das novas votações
+        n_new = len(self.votacoes) - first_new
+        n_parties, k = len(self.parties), len(VOTE_VALUES)
+        local = v_codes - first_new
+        flat = (local.astype(np.int64) * n_parties + p_codes) * k + k_codes
+        counts = np.bincount(flat, minlength=n_new * n_parties * k).reshape(n_new, n_parties, k)
+        self._counts[first_new:] = counts
+
+        if 'dataRegistroVoto' in votes_df.columns:
+            dates = pd.to_datetime(votes_df['dataRegistroVoto'], errors='coerce')
+            first_dates = dates.groupby(local).min()
+            self._dates[first_new + first_dates.index.to_numpy()] = first_dates.to_numpy(dtype='datetime64[ns]')
+
+        # Fidelidade ao partido (voto = maioria do partido) e alinhamento ao governo
+        majority = counts.argmax(axis=-1)[local, p_codes]
+        government = self._government[v_codes]
+        has_government = government >= 0
+        n_deputies = len(self.deputies)
+        self._deputy_stats[:, 0] += np.bincount(d_codes, minlength=n_deputies)
+        self._deputy_stats[:, 1] += np.bincount(d_codes, weights=k_codes == majority,
+                                                minlength=n_deputies).astype(np.int64)
+        self._deputy_stats[:, 2] += np.bincount(d_codes, weights=has_government,
+                                                minlength=n_deputies).astype(np.int64)
+        self._deputy_stats[:, 3] += np.bincount(d_codes, weights=has_government & (k_codes == government),
+                                                minlength=n_deputies).astype(np.int64)
+        self._deputy_party[d_codes] = p_codes
+
+        logger.info(f"{len(votes_df)} votos de {n_new} novas votações incorporados")
+        return self
+
+    def per_votacao(self):
+        """Métricas por votação e partido: contagens, coesão, índice de Rice e alinhamento ao governo."""
+        totals = self._counts.sum(axis=-1)
+        v, p = np.nonzero(totals)
+        counts = self._counts[v, p]
+        total = totals[v, p]
+        sim, nao = counts[:, SIM], counts[:, NAO]
+        sim_nao = sim + nao
+        majority = counts.argmax(axis=-1)
+        government = self._government[v]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rice = np.where(sim_nao > 0, np.abs(sim - nao) / sim_nao, np.nan)
+
+        return pd.DataFrame({
+            'idVotacao': np.asarray(self.votacoes.values, dtype=object)[v],
+            'data': self._dates[v],
+            'siglaPartido': np.asarray(self.parties.values, dtype=object)[p],
+            'total_votos': total,
+            'votos_sim': sim,
+            'votos_nao': nao,
+            'orientacao_maioria': np.asarray(VOTE_VALUES, dtype=object)[majority],
+            'coesao_percentual': counts.max(axis=-1) / total * 100,
+            'indice_rice': rice,
+            'alinhado_governo': np.where(government >= 0, majority == government, np.nan),
+        })
+
+    def per_party(self, votacao_metrics=None):
+        """Métricas agregadas por partido (médias sobre as votações)."""
+        metrics = self.per_votacao() if votacao_metrics is None else votacao_metrics
+        grouped = metrics.groupby('siglaPartido', sort=True)
+        return pd.DataFrame({
+            'votacoes': grouped.size(),
+            'total_votos': grouped['total_votos'].sum(),
+            'coesao_media': grouped['coesao_percentual'].mean(),
+            'indice_rice_medio': grouped['indice_rice'].mean(),
+            'alinhamento_governo': grouped['alinhado_governo'].mean() * 100,
+        }).reset_index()
+
+    def per_party_over_time(self, freq='M'):
+        """Métricas por partido e período (mês por padrão), pela data da votação."""
+        metrics = self.per_votacao().dropna(subset=['data'])
+        metrics['periodo'] = metrics['data'].dt.to_period(freq).astype(str)
+        grouped = metrics.groupby(['siglaPartido', 'periodo'], sort=True)
+        return pd.DataFrame({
+            'votacoes': grouped.size(),
+            'coesao_media': grouped['coesao_percentual'].mean(),
+            'indice_rice_medio': grouped['indice_rice'].mean(),
+            'alinhamento_governo': grouped['alinhado_governo'].mean() * 100,
+        }).reset_index()
+
+    def per_deputy(self):
+        """Métricas por deputado: votos, fidelidade ao partido e alinhamento ao governo."""
+        total, with_party, government_total, with_government = self._deputy_stats.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.DataFrame({
+                'idDeputado': np.asarray(self.deputies.values),
+                'siglaPartido': np.asarray(self.parties.values, dtype=object)[self._deputy_party],
+                'total_votos': total,
+                'fidelidade_partidaria': np.where(total > 0, with_party / total * 100, np.nan),
+                'alinhamento_governo': np.where(government_total > 0,
+                                                with_government / government_total * 100, np.nan),
+            })
+
+    def save(self, path):
+        """Persiste o estado (contagens e vocabulários) em um arquivo .npz."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            votacoes=np.asarray(self.votacoes.values, dtype=str),
+            parties=np.asarray(self.parties.values, dtype=str),
+            deputies=np.asarray(self.deputies.values, dtype=np.int64),
+            counts=self._counts,
+            dates=self._dates,
+            government=self._government,
+            deputy_party=self._deputy_party,
+            deputy_stats=self._deputy_stats,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        engine = cls()
+        with np.load(path) as data:
+            engine.votacoes = Vocabulary(data['votacoes'].tolist())
+            engine.parties = Vocabulary(data['parties'].tolist())
+            engine.deputies = Vocabulary(data['deputies'].tolist())
+            engine._counts = data['counts']
+            engine._dates = data['dates']
+            engine._government = data['government']
+            engine._deputy_party = data['deputy_party']
+            engine._deputy_stats = data['deputy_stats']
+        return engine
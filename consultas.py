@@ -0,0 +1,355 @@
+"""
+Camada de consulta em memória para o dashboard
+
+O QueryService abre uma única vez as tabelas publicadas (deputados e
+proposições atuais em final/*_atual e os agregados de final/agregados), monta
+índices por coluna de filtro (posições das linhas por valor e, para datas, a
+ordem das linhas) e responde filtros e agregações sem reler arquivos. Os
+resultados ficam em um cache LRU, descartado quando uma nova execução da DAG
+publica dados (marcador em state/publicacao.json).
+
+Uso (ex.: no dashboard Streamlit, uma instância por processo):
+    service = get_service('/opt/airflow/data', 'parquet')
+    service.filter('deputados', {'siglaPartido': ['PT', 'PL'], 'siglaUf': 'SP'})
+    service.aggregate('proposicoes', ['siglaTipo'], {'dataApresentacao': ('2023-01-01', '2023-06-30')})
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.agregados import PREFIX as AGGREGATES_PREFIX, TABLE_LAYER
+from utils.armazenamento import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Sufixo das tabelas com a versão atual de cada registro (ex.: final/deputados_atual)
+CURRENT_SUFFIX = 'atual'
+
+# Resultados mantidos no cache LRU
+DEFAULT_CACHE_SIZE = 512
+
+# Intervalo mínimo (s) entre verificações do marcador de publicação
+CHECK_INTERVAL = 1.0
+
+@dataclass
+class QueryDataset:
+    """Tabela consultável: local (camada e entidade), colunas indexadas e coluna de data."""
+    layer: str
+    entity: str
+    indexes: list = field(default_factory=list)
+    date: Optional[str] = None
+
+DATASETS = {
+    'deputados': QueryDataset(TABLE_LAYER, f'deputados_{CURRENT_SUFFIX}', ['siglaPartido', 'siglaUf', 'regiao']),
+    'proposicoes': QueryDataset(TABLE_LAYER, f'proposicoes_{CURRENT_SUFFIX}', ['siglaTipo', 'ano'],
+                                date='dataApresentacao'),
+    'deputados_partido_uf': QueryDataset(TABLE_LAYER, f'{AGGREGATES_PREFIX}/deputados_partido_uf',
+                                         ['siglaPartido', 'siglaUf', 'regiao']),
+    'proposicoes_tipo_mes': QueryDataset(TABLE_LAYER, f'{AGGREGATES_PREFIX}/proposicoes_tipo_mes',
+                                         ['siglaTipo', 'mes']),
+    'votos_partido_mes': QueryDataset(TABLE_LAYER, f'{AGGREGATES_PREFIX}/votos_partido_mes',
+                                      ['siglaPartido', 'mes', 'voto']),
+    'coesao_por_partido': QueryDataset(TABLE_LAYER, f'{AGGREGATES_PREFIX}/coesao_por_partido', ['siglaPartido']),
+    'coesao_mensal': QueryDataset(TABLE_LAYER, f'{AGGREGATES_PREFIX}/coesao_mensal', ['siglaPartido']),
+}
+
+def publish_current(storage, entity, processed_entity, delta_location=None, keys=None, key='id'):
+    """Atualiza final/{entidade}_atual com o delta processado da execução.
+
+    keys: chaves vigentes (ex.: ids da lista de deputados); as demais são
+    removidas. Na primeira publicação, a tabela é montada com todas as
+    extrações processadas (a mais recente de cada chave prevalece).
+    """
+    location = storage.location(TABLE_LAYER, f'{entity}_{CURRENT_SUFFIX}')
+    if storage.exists(location):
+        frames = [storage.read(location)]
+        if delta_location:
+            frames.append(storage.read(delta_location))
+    else:
+        frames = [storage.read(partition) for _, partition in storage.partitions('processed', processed_entity)]
+    if not frames:
+        logger.warning(f"Nenhum dado processado de {entity} para publicar")
+        return None
+
+    current = pd.concat(frames, ignore_index=True).drop_duplicates(subset=key, keep='last')
+    if keys is not None:
+        current = current[current[key].isin(keys)]
+    location = storage.write(current.reset_index(drop=True), TABLE_LAYER, f'{entity}_{CURRENT_SUFFIX}')
+    logger.info(f"{len(current)} registros de {entity} publicados em {location}")
+    return location
+
+def mark_published(path, datasets=None):
+    """Registra uma nova publicação; os QueryService abertos descartam tabelas e cache."""
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'versao': version, 'publicado_em': datetime.now().isoformat(),
+                   'conjuntos': sorted(datasets or DATASETS)}, f, indent=2)
+    os.replace(tmp_path, path)
+    return version
+
+class ColumnIndex:
+    """Posições (ordenadas) das linhas por valor de uma coluna."""
+
+    def __init__(self, series):
+        codes, uniques = pd.factorize(series, sort=False)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.positions = {value: order[bounds[i]:bounds[i + 1]]
+                          for i, value in enumerate(pd.Index(uniques).tolist())}
+
+    def lookup(self, values):
+        """Posições das linhas com algum dos valores (lista vazia se nenhum existir)."""
+        found = [self.positions[value] for value in values if value in self.positions]
+        if len(found) == 1:
+            return found[0]
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+
+class DateIndex:
+    """Linhas ordenadas por data, para filtros por intervalo com busca binária."""
+
+    def __init__(self, series):
+        values = pd.to_datetime(series, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        valid = np.flatnonzero(~np.isnat(values))
+        order = np.argsort(values[valid], kind='stable')
+        self.order = valid[order]
+        self.values = values[self.order]
+
+    def between(self, start=None, end=None):
+        """Posições com data em [start, end]; datas sem horário incluem o dia inteiro."""
+        low = 0 if start is None else np.searchsorted(self.values, np.datetime64(pd.Timestamp(start), 'ns'))
+        high = len(self.values)
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                end += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+            high = np.searchsorted(self.values, np.datetime64(end, 'ns'), side='right')
+        return np.sort(self.order[low:high])
+
+class _Table:
+    """Tabela carregada e seus índices (montados na abertura)."""
+
+    def __init__(self, df, spec):
+        if df.index.name is not None or isinstance(df.index, pd.MultiIndex):
+            df = df.reset_index()
+        self.df = df.reset_index(drop=True)
+        self.indexes = {col: ColumnIndex(self.df[col]) for col in spec.indexes if col in self.df.columns}
+        self.date_column = spec.date if spec.date in self.df.columns else None
+        self.date_index = DateIndex(self.df[spec.date]) if self.date_column else None
+
+    def select(self, where):
+        """Aplica os filtros: índices primeiro (menor conjunto de posições), demais colunas por máscara."""
+        positions = None
+        remaining = {}
+        for col, value in (where or {}).items():
+            if col not in self.df.columns:
+                raise ValueError(f"Coluna de filtro inexistente: {col}")
+            if col == self.date_column:
+                start, end = value
+                found = self.date_index.between(start, end)
+            elif col in self.indexes:
+                found = self.indexes[col].lookup(_as_list(value))
+            else:
+                remaining[col] = value
+                continue
+            positions = found if positions is None else np.intersect1d(positions, found, assume_unique=True)
+
+        result = self.df if positions is None else self.df.take(positions)
+        for col, value in remaining.items():
+            result = result[result[col].isin(_as_list(value))]
+        return result
+
+@dataclass
+class QueryStats:
+    """Contadores do cache de resultados."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    loads: int = 0
+
+class LRUCache:
+    """Cache de resultados em memória com despejo do item usado há mais tempo (seguro entre threads)."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, stats=None):
+        self.max_entries = max_entries
+        self.stats = stats or QueryStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(True, valor) se presente; (False, None) caso contrário."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return True, self._entries[key]
+            self.stats.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+def _freeze(value):
+    """Versão hashável dos argumentos de uma consulta (chave do cache)."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(item) for item in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    return value
+
+class QueryService:
+    """Consultas de filtro e agregação sobre as tabelas publicadas, em memória.
+
+    where: {coluna: valor ou lista de valores}; para a coluna de data do
+    conjunto, (início, fim) com fim inclusivo (None deixa o lado aberto).
+    Os DataFrames devolvidos são compartilhados pelo cache e não devem ser
+    modificados.
+    """
+
+    def __init__(self, storage, publication_path=None, cache_size=DEFAULT_CACHE_SIZE,
+                 check_interval=CHECK_INTERVAL, datasets=None):
+        self.storage = storage
+        self.publication_path = publication_path or os.path.join(storage.base_dir, 'state', 'publicacao.json')
+        self.check_interval = check_interval
+        self.datasets = datasets or DATASETS
+        self.stats = QueryStats()
+        self.cache = LRUCache(cache_size, self.stats)
+        self._tables = {}
+        self._load_lock = threading.Lock()
+        self._version = self._read_version()
+        self._checked_at = time.monotonic()
+
+    def _read_version(self):
+        try:
+            with open(self.publication_path, encoding='utf-8') as f:
+                return json.load(f).get('versao')
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def version(self):
+        return self._version
+
+    def refresh(self, force=False):
+        """Verifica o marcador de publicação; se houver nova versão, descarta tabelas e cache."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        version = self._read_version()
+        if version == self._version and not force:
+            return False
+        with self._load_lock:
+            self._tables = {}
+            self._version = version
+        self.cache.clear()
+        logger.info(f"Nova publicação {version}: tabelas de consulta recarregadas sob demanda")
+        return True
+
+    def _table(self, dataset):
+        table = self._tables.get(dataset)
+        if table is not None:
+            return table
+        spec = self.datasets.get(dataset)
+        if spec is None:
+            raise ValueError(f"Conjunto desconhecido: {dataset}")
+        with self._load_lock:
+            table = self._tables.get(dataset)
+            if table is None:
+                location = self.storage.location(spec.layer, spec.entity)
+                if not self.storage.exists(location):
+                    raise ValueError(f"Conjunto {dataset} ainda não publicado em {location}")
+                table = _Table(self.storage.read(location), spec)
+                self._tables[dataset] = table
+                self.stats.loads += 1
+        return table
+
+    def _cached(self, key, compute):
+        self.refresh()
+        key = (self._version,) + key
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        value = compute()
+        self.cache.put(key, value)
+        return value
+
+    def filter(self, dataset, where=None, columns=None, sort=None, limit=None):
+        """Linhas de dataset que atendem a where (opcionalmente colunas, ordenação e limite)."""
+        def compute():
+            result = self._table(dataset).select(where)
+            if sort:
+                result = result.sort_values(sort)
+            if limit is not None:
+                result = result.head(limit)
+            if columns is not None:
+                result = result[list(columns)]
+            return result.reset_index(drop=True)
+        return self._cached(('filter', dataset, _freeze(where), _freeze(columns), _freeze(sort), limit), compute)
+
+    def aggregate(self, dataset, by, where=None, value=None, func='count'):
+        """Agrega as linhas filtradas por `by`: contagem de linhas ou func ('sum', 'mean'...) de value.
+
+        Conjuntos agregados (com coluna 'total') somam o total em vez de contar linhas.
+        """
+        by = _as_list(by)
+
+        def compute():
+            selected = self._table(dataset).select(where)
+            if value is None and func == 'count':
+                if 'total' in selected.columns:
+                    grouped = selected.groupby(by, observed=True)['total'].sum()
+                else:
+                    grouped = selected.groupby(by, observed=True).size()
+                result = grouped.rename('total')
+            else:
+                result = selected.groupby(by, observed=True)[value].agg(func)
+            return result.reset_index().sort_values(by, ignore_index=True)
+        return self._cached(('aggregate', dataset, tuple(by), _freeze(where), value, func), compute)
+
+    def values(self, dataset, column):
+        """Valores distintos de uma coluna (ex.: opções dos filtros do dashboard)."""
+        def compute():
+            table = self._table(dataset)
+            if column in table.indexes:
+                return sorted(table.indexes[column].positions, key=str)
+            return sorted(table.df[column].dropna().unique().tolist(), key=str)
+        return self._cached(('values', dataset, column), compute)
+
+    def get_stats(self):
+        return {**asdict(self.stats), 'entries': len(self.cache), 'version': self._version,
+                'tables': sorted(self._tables)}
+
+@functools.lru_cache(maxsize=None)
+def get_service(data_dir, storage_format='parquet'):
+    """QueryService compartilhado do processo (ex.: entre as sessões do Streamlit)."""
+    return QueryService(get_storage(storage_format, data_dir))
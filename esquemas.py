@@ -0,0 +1,217 @@
+"""
+Registro de esquemas por entidade e conversão para tipos compactos
+
+Textos repetidos viram categorias, identificadores e anos viram inteiros
+anuláveis do menor tamanho adequado (Int8..Int32, sem passar por float64 com
+NaN) e textos livres viram strings com armazenamento Arrow. Os esquemas são
+aplicados na gravação e na leitura da camada de armazenamento e ao fim das
+transformações.
+"""
+import logging
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (habilita strings com armazenamento Arrow)
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    STRING_DTYPE = pd.StringDtype()
+
+logger = logging.getLogger(__name__)
+
+CATEGORY = 'category'
+STRING = 'string'
+DATETIME = 'datetime'
+
+_DEPUTIES = {
+    'id': 'Int32',
+    'nome': STRING,
+    'siglaPartido': CATEGORY,
+    'siglaUf': CATEGORY,
+    'regiao': CATEGORY,
+    'idLegislatura': 'Int16',
+    'email': STRING,
+    'urlFoto': STRING,
+    'uri': STRING,
+    'uriPartido': STRING,
+    'nomeCivil': STRING,
+    'nomeEleitoral': STRING,
+    'sexo': CATEGORY,
+    'dataNascimento': DATETIME,
+    'dataFalecimento': DATETIME,
+    'ufNascimento': CATEGORY,
+    'municipioNascimento': STRING,
+    'escolaridade': CATEGORY,
+    'urlWebsite': STRING,
+    'situacao': CATEGORY,
+    'condicaoEleitoral': CATEGORY,
+    'descricaoStatus': STRING,
+    'dataUltimoStatus': DATETIME,
+    'gabineteNome': STRING,
+    'gabinetePredio': STRING,
+    'gabineteSala': STRING,
+    'gabineteAndar': STRING,
+    'gabineteTelefone': STRING,
+    'gabineteEmail': STRING,
+    'redeSocial': STRING,
+    'data_processamento': DATETIME,
+}
+
+# Colunas (nome -> tipo) por esquema; colunas fora do esquema ficam inalteradas
+SCHEMAS = {
+    'deputados': _DEPUTIES,
+    'proposicoes': {
+        'id': 'Int32',
+        'uri': STRING,
+        'siglaTipo': CATEGORY,
+        'codTipo': 'Int16',
+        'numero': 'Int32',
+        'ano': 'Int16',
+        'ementa': STRING,
+        'dataApresentacao': DATETIME,
+        'anoApresentacao': 'Int16',
+        'identificacao': STRING,
+        'data_processamento': DATETIME,
+    },
+    'votacoes': {
+        'id': STRING,
+        'uri': STRING,
+        'data': DATETIME,
+        'dataHoraRegistro': DATETIME,
+        'siglaOrgao': CATEGORY,
+        'uriOrgao': STRING,
+        'uriEvento': STRING,
+        'proposicaoObjeto': STRING,
+        'uriProposicaoObjeto': STRING,
+        'descricao': STRING,
+        'aprovacao': 'Int8',
+        'proposicaoId': 'Int32',
+    },
+    'votos': {
+        'idVotacao': CATEGORY,
+        'idDeputado': 'Int32',
+        'siglaPartido': CATEGORY,
+        'siglaUf': CATEGORY,
+        'voto': CATEGORY,
+        'dataRegistroVoto': DATETIME,
+    },
+    'orientacoes': {
+        'idVotacao': CATEGORY,
+        'siglaPartidoBloco': CATEGORY,
+        'codTipoLideranca': CATEGORY,
+        'orientacaoVoto': CATEGORY,
+    },
+}
+
+# Conjuntos gravados (padrões fnmatch do nome da entidade) -> esquema
+ENTITY_SCHEMAS = {
+    'deputados': 'deputados',
+    'deputados_*': 'deputados',
+    'proposicoes': 'proposicoes',
+    'proposicoes_*': 'proposicoes',
+    'votacoes': 'votacoes',
+    'votacoes_*': 'votacoes',
+    'votos': 'votos',
+    'votos_*': 'votos',
+    'orientacoes': 'orientacoes',
+    'orientacoes_*': 'orientacoes',
+}
+
+def schema_for(entity):
+    """Esquema de um conjunto pelo nome da entidade (ex.: votacoes_lotes/00001); None se não houver."""
+    if entity is None:
+        return None
+    base = entity.split('/')[0]
+    for pattern, schema in ENTITY_SCHEMAS.items():
+        if fnmatch(base, pattern):
+            return SCHEMAS[schema]
+    return None
+
+def _cast(series, kind):
+    if kind == CATEGORY:
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if kind == STRING:
+        # Nulos continuam nulos (astype(str) os transformaria em 'nan')
+        return series if series.dtype == STRING_DTYPE else series.astype(STRING_DTYPE)
+    if kind == DATETIME:
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, errors='coerce', format='ISO8601')
+
+    return to_nullable_int(series, kind)
+
+def to_nullable_int(series, kind='Int64'):
+    """Converte para inteiro anulável; valores fora do intervalo do tipo mantêm Int64.
+
+    Valores não numéricos ou não inteiros (ex.: 1.5) viram nulos, nunca
+    arredondados, e são registrados no log.
+    """
+    if series.dtype == kind:
+        return series
+    numeric = pd.to_numeric(series, errors='coerce')
+    invalid = numeric.isna() & series.notna()
+    if pd.api.types.is_float_dtype(numeric):
+        invalid |= numeric.notna() & (numeric % 1 != 0)
+    if invalid.any():
+        logger.warning(f"{int(invalid.sum())} valores não inteiros em {series.name} descartados: "
+                       f"{series[invalid].unique()[:10].tolist()}")
+        numeric = numeric.mask(invalid)
+    try:
+        return numeric.astype(kind)
+    except (TypeError, ValueError, OverflowError):
+        logger.warning(f"Valores fora do intervalo de {kind} em {series.name}; usando Int64")
+        return numeric.astype('Int64')
+
+def apply_schema(df, schema, inplace=False):
+    """Converte as colunas de df presentes no esquema (nome registrado ou dicionário).
+
+    Com o log em nível DEBUG, registra a memória antes e depois da conversão
+    (memory_usage com deep=True, custo proporcional ao número de linhas).
+    """
+    name = schema if isinstance(schema, str) else next((key for key, value in SCHEMAS.items()
+                                                        if value is schema), 'esquema')
+    if isinstance(schema, str):
+        schema = SCHEMAS[schema]
+    if df is None or not schema:
+        return df
+
+    # Cópia rasa: mantém as colunas originais para o relatório mesmo com inplace=True
+    before = df.copy(deep=False) if logger.isEnabledFor(logging.DEBUG) else None
+    result = df if inplace else df.copy(deep=False)
+    for col, kind in schema.items():
+        if col in result.columns:
+            result[col] = _cast(result[col], kind)
+    if before is not None:
+        memory_report(before, result).log(name, level=logging.DEBUG)
+    return result
+
+@dataclass
+class MemoryReport:
+    """Memória (bytes, com deep=True) antes e depois da aplicação do esquema."""
+    rows: int
+    before: int
+    after: int
+    columns: dict = field(default_factory=dict)
+
+    @property
+    def ratio(self):
+        return self.before / self.after if self.after else None
+
+    def to_dict(self):
+        return {'rows': self.rows, 'before_mb': self.before / 2 ** 20, 'after_mb': self.after / 2 ** 20,
+                'ratio': self.ratio, 'columns': self.columns}
+
+    def log(self, label='', level=logging.INFO):
+        logger.log(level, f"Memória {label}: {self.before / 2 ** 20:.1f} MB -> {self.after / 2 ** 20:.1f} MB "
+                          f"({self.ratio or 0:.1f}x) em {self.rows} linhas")
+
+def memory_report(before_df, after_df):
+    """Compara a memória de um DataFrame antes e depois da conversão de tipos."""
+    before = before_df.memory_usage(deep=True, index=False)
+    after = after_df.memory_usage(deep=True, index=False)
+    columns = {col: {'before': int(before[col]), 'after': int(after.get(col, 0)),
+                     'dtype': str(after_df[col].dtype) if col in after_df.columns else None}
+               for col in before.index}
+    return MemoryReport(len(before_df), int(before.sum()), int(after.sum()), columns)
@@ -0,0 +1,65 @@
+"""
+Suporte à extração incremental: marcas d'água por entidade e merge de deltas
+"""
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class WatermarkStore:
+    """Guarda a marca d'água (última data extraída com sucesso) de cada entidade em JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, entity, default=None):
+        with self._lock:
+            return self._load().get(entity, default)
+
+    def set(self, entity, value):
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+
+        with self._lock:
+            state = self._load()
+            state[entity] = value
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+        logger.info(f"Marca d'água de {entity} atualizada para {value}")
+
+def iter_date_windows(start, end, days=30):
+    """Divide o intervalo [start, end] em janelas de no máximo `days` dias."""
+    start = pd.Timestamp(start).date()
+    end = pd.Timestamp(end).date()
+    while start <= end:
+        window_end = min(start + timedelta(days=days - 1), end)
+        yield start, window_end
+        start = window_end + timedelta(days=1)
+
+def merge_incremental(existing_df, delta_df, key='id'):
+    """Incorpora um delta ao conjunto consolidado, mantendo a versão mais recente por chave."""
+    if existing_df is not None and not existing_df.empty:
+        merged = pd.concat([existing_df, delta_df], ignore_index=True)
+        merged = merged.drop_duplicates(subset=key, keep='last').reset_index(drop=True)
+    else:
+        merged = delta_df.reset_index(drop=True)
+
+    logger.info(f"Delta com {len(delta_df)} registros incorporado; total de {len(merged)} registros")
+    return merged
@@ -0,0 +1,275 @@
+"""
+Ingestão dos arquivos anuais em massa da Câmara (JSON ou CSV)
+
+Para cargas históricas, os arquivos publicados por ano em
+dadosabertos.camara.leg.br/arquivos (proposições, votações, votos e
+orientações) são muito mais rápidos que a API paginada. Os arquivos são lidos
+em fluxo, de um caminho local ou de uma URL: o JSON é decodificado registro a
+registro (json.JSONDecoder.raw_decode sobre um buffer de tamanho limitado) e o
+CSV, em blocos. Cada bloco é convertido para as colunas e os tipos do caminho
+REST, de modo que clean_* e check_* funcionam sem alterações.
+
+Uso (na pasta de DAGs do Airflow):
+    python -m utils.ingestao_bulk --anos 2019 2023 --fonte /dados/arquivos --formato-arquivo csv
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+import requests
+
+from utils.armazenamento import get_storage
+from utils.esquemas import apply_schema
+from utils.metricas import timed_iter
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = '/opt/airflow/data'
+
+BULK_BASE_URL = 'https://dadosabertos.camara.leg.br/arquivos'
+
+# Registros por bloco gravado (limita a memória da ingestão)
+BULK_CHUNK_ROWS = 50000
+
+# Caracteres lidos por vez do arquivo JSON
+JSON_READ_CHARS = 1 << 20
+
+# Início da lista de registros: {"dados": [ ... ]} ou uma lista no primeiro nível
+_RECORDS_START = re.compile(r'^\s*\[|"dados"\s*:\s*\[')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def _proposition_id(df):
+    """Id da proposição a partir da URI (.../proposicoes/{id}), como no caminho REST."""
+    uri = df['uriProposicaoObjeto'].astype('string')
+    extracted = uri.str.extract(r'/proposicoes/(\d+)$', expand=False)
+    return df.assign(proposicaoId=df['proposicaoId'].fillna(extracted))
+
+@dataclass
+class BulkDataset:
+    """Arquivo anual e sua conversão para o formato do caminho REST.
+
+    - file: nome do arquivo (ex.: votacoesVotos -> votacoesVotos-2023.json);
+    - columns: coluna do arquivo (aninhamentos unidos por '_', como no CSV) -> coluna do caminho REST;
+      colunas ausentes no arquivo ficam nulas;
+    - schema: esquema aplicado a cada bloco;
+    - derive: função aplicada após a renomeação (ex.: extrair o id da proposição).
+    """
+    file: str
+    columns: dict
+    schema: str
+    derive: Optional[Callable] = None
+
+    @property
+    def output_columns(self):
+        return list(dict.fromkeys(self.columns.values()))
+
+DATASETS = {
+    'proposicoes': BulkDataset('proposicoes', {
+        'id': 'id', 'uri': 'uri', 'siglaTipo': 'siglaTipo', 'codTipo': 'codTipo', 'numero': 'numero',
+        'ano': 'ano', 'ementa': 'ementa', 'dataApresentacao': 'dataApresentacao',
+    }, 'proposicoes'),
+    'votacoes': BulkDataset('votacoes', {
+        'id': 'id', 'uri': 'uri', 'data': 'data', 'dataHoraRegistro': 'dataHoraRegistro',
+        'siglaOrgao': 'siglaOrgao', 'uriOrgao': 'uriOrgao', 'uriEvento': 'uriEvento',
+        'ultimaApresentacaoProposicao_uriProposicao': 'uriProposicaoObjeto',
+        'ultimaApresentacaoProposicao_descricao': 'proposicaoObjeto',
+        'descricao': 'descricao', 'aprovacao': 'aprovacao', 'proposicaoId': 'proposicaoId',
+    }, 'votacoes', derive=_proposition_id),
+    'votos': BulkDataset('votacoesVotos', {
+        'idVotacao': 'idVotacao', 'deputado_id': 'idDeputado', 'deputado_siglaPartido': 'siglaPartido',
+        'deputado_siglaUf': 'siglaUf', 'voto': 'voto', 'dataHoraVoto': 'dataRegistroVoto',
+    }, 'votos'),
+    'orientacoes': BulkDataset('votacoesOrientacoes', {
+        'idVotacao': 'idVotacao', 'siglaBancada': 'siglaPartidoBloco',
+        'codTipoLideranca': 'codTipoLideranca', 'orientacao': 'orientacaoVoto',
+    }, 'orientacoes'),
+}
+
+def bulk_source(source, dataset, year, fmt='json'):
+    """Caminho ou URL do arquivo anual: `source` é um diretório, uma URL base ou o próprio arquivo."""
+    file_name = f"{DATASETS[dataset].file}-{year}.{fmt}"
+    if os.path.isdir(source):
+        path = os.path.join(source, file_name)
+        return path if os.path.exists(path) or not os.path.exists(f"{path}.gz") else f"{path}.gz"
+    if source.startswith(('http://', 'https://')) and not _format_of(source):
+        return f"{source.rstrip('/')}/{DATASETS[dataset].file}/{fmt}/{file_name}"
+    return source
+
+def _format_of(source):
+    name = source.split('?')[0].lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for fmt in ('json', 'csv'):
+        if name.endswith(f'.{fmt}'):
+            return fmt
+    return None
+
+@contextmanager
+def open_bulk(source, timeout=60):
+    """Abre o arquivo (caminho local ou URL) como fluxo binário, descompactando .gz."""
+    response = None
+    if source.startswith(('http://', 'https://')):
+        response = requests.get(source, stream=True, timeout=timeout)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        stream = response.raw
+    else:
+        stream = open(source, 'rb')
+    try:
+        if source.split('?')[0].lower().endswith('.gz'):
+            with gzip.GzipFile(fileobj=stream) as decompressed:
+                yield decompressed
+        else:
+            yield stream
+    finally:
+        stream.close()
+        if response is not None:
+            response.close()
+
+def iter_json_records(stream, read_chars=JSON_READ_CHARS):
+    """Gera os registros de um JSON {"dados": [...]} (ou lista) sem carregar o arquivo inteiro.
+
+    Apenas o trecho ainda não decodificado fica em memória (um registro que não
+    cabe no trecho lido é completado com as leituras seguintes).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+
+    def read_more():
+        nonlocal buffer, position, eof
+        chunk = text.read(read_chars)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        match = _RECORDS_START.search(buffer)
+        if match:
+            position = match.end()
+            break
+        if eof:
+            raise ValueError("Lista de registros não encontrada no arquivo JSON")
+        read_more()
+
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                raise ValueError("Arquivo JSON truncado: lista de registros sem fim")
+            read_more()
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"JSON inválido perto do caractere {position} do trecho lido")
+            read_more()
+            continue
+        yield record
+        position = end
+        if position > read_chars:
+            buffer, position = buffer[position:], 0
+
+def _flatten(record, prefix=''):
+    """Une objetos aninhados com '_' (deputado_ -> deputado_id), como nas colunas dos arquivos CSV."""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}" if not prefix or prefix.endswith('_') else f"{prefix}_{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        else:
+            flat[name] = value
+    return flat
+
+def iter_json_frames(stream, chunk_rows=BULK_CHUNK_ROWS):
+    """Registros do JSON achatados, em DataFrames de até chunk_rows linhas."""
+    batch = []
+    for record in iter_json_records(stream):
+        batch.append(_flatten(record))
+        if len(batch) >= chunk_rows:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+def iter_csv_frames(stream, chunk_rows=BULK_CHUNK_ROWS, sep=';'):
+    """Blocos do CSV (separado por ';', como os arquivos da Câmara), com todas as colunas como texto."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    yield from pd.read_csv(text, sep=sep, dtype=str, chunksize=chunk_rows)
+
+def normalize_frame(df, dataset):
+    """Converte um bloco do arquivo para as colunas e os tipos do caminho REST."""
+    spec = DATASETS[dataset]
+    df = df.rename(columns=spec.columns)
+    if spec.derive is not None:
+        df = spec.derive(df.reindex(columns=df.columns.union(spec.output_columns, sort=False)))
+    df = df.reindex(columns=spec.output_columns)
+    return apply_schema(df, spec.schema, inplace=True)
+
+def iter_bulk_frames(source, dataset, fmt=None, chunk_rows=BULK_CHUNK_ROWS):
+    """Gera os blocos normalizados de um arquivo anual (cada bloco medido como etapa "extract")."""
+    fmt = fmt or _format_of(source)
+    if fmt not in ('json', 'csv'):
+        raise ValueError(f"Formato do arquivo não reconhecido: {source}")
+
+    def frames():
+        with open_bulk(source) as stream:
+            parse = iter_json_frames if fmt == 'json' else iter_csv_frames
+            for frame in parse(stream, chunk_rows):
+                if not frame.empty:
+                    yield normalize_frame(frame, dataset)
+
+    return timed_iter(frames(), 'extract')
+
+def ingest_year(storage, year, source=BULK_BASE_URL, fmt='json', datasets=tuple(DATASETS),
+                chunk_rows=BULK_CHUNK_ROWS):
+    """Grava os conjuntos de um ano em raw/{conjunto}_bulk/{ano}.
+
+    Retorna, por conjunto, o local gravado e o número de linhas. Nos arquivos
+    anuais, as votações (e seus votos) são agrupadas pelo ano da votação, não
+    pelo ano de apresentação da proposição como nas janelas do backfill
+    (raw/{conjunto}_historico); por isso as entidades são distintas e uma carga
+    não sobrescreve a outra.
+    """
+    result = {}
+    for dataset in datasets:
+        path = bulk_source(source, dataset, year, fmt)
+        location, total = storage.write_frames(iter_bulk_frames(path, dataset, fmt, chunk_rows),
+                                               'raw', f'{dataset}_bulk/{year}')
+        result[dataset] = location if total else None
+        result[f'{dataset}_linhas'] = total
+        logger.info(f"{total} registros de {dataset} de {year} ingeridos de {path}")
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão dos arquivos anuais da Câmara")
+    parser.add_argument('--anos', type=int, nargs=2, required=True, metavar=('INICIO', 'FIM'))
+    parser.add_argument('--fonte', default=BULK_BASE_URL, help="diretório local, URL base ou arquivo")
+    parser.add_argument('--formato-arquivo', choices=['json', 'csv'], default='json')
+    parser.add_argument('--conjuntos', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--data-dir', default=os.environ.get('CAMARA_DATA_DIR', DATA_DIR))
+    parser.add_argument('--formato', default=os.environ.get('CAMARA_STORAGE_FORMAT', 'parquet'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    storage = get_storage(args.formato, args.data_dir)
+    report = {}
+    for year in range(args.anos[0], args.anos[1] + 1):
+        report[year] = ingest_year(storage, year, args.fonte, args.formato_arquivo, args.conjuntos)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
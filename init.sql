@@ -8,4 +8,8 @@ GRANT ALL PRIVILEGES ON DATABASE airflow TO airflow;
 
 -- Configurações específicas (opcional)
 CREATE SCHEMA IF NOT EXISTS airflow AUTHORIZATION airflow;
-GRANT ALL ON SCHEMA airflow TO airflow;
\ No newline at end of file
+GRANT ALL ON SCHEMA airflow TO airflow;
+
+-- Banco de dados com os dados da Câmara (carregado pela tarefa load_postgres)
+\c postgres
+CREATE DATABASE camara OWNER airflow;
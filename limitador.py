@@ -0,0 +1,141 @@
+"""
+Limitador de taxa (token bucket) compartilhado entre threads e processos
+
+O estado do balde (fichas, taxa atual, bloqueio por Retry-After) pode ficar em
+um arquivo JSON protegido por flock, de modo que todas as tarefas do worker
+dividam a mesma cota de requisições. A taxa se adapta às respostas (AIMD):
+cresce aos poucos a cada sucesso e cai pela metade a cada 429/503.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:  # sem flock (ex.: Windows): o limite vale só para o processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(value):
+    """Segundos indicados no cabeçalho Retry-After (número ou data HTTP); None se ausente/inválido."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """Token bucket com taxa adaptativa.
+
+    Uso:
+        limiter = RateLimiter(rate=10, burst=10, state_path='/opt/airflow/data/state/rate_limiter.json')
+        limiter.acquire()            # antes de cada requisição
+        limiter.reward()             # resposta bem-sucedida
+        limiter.penalize(retry_after)  # 429/503
+
+    - rate: requisições por segundo iniciais (o estado salvo, se existir, prevalece);
+    - burst: fichas máximas acumuladas;
+    - min_rate/max_rate: limites da adaptação;
+    - increase: req/s somados à taxa a cada segundo de sucessos;
+    - decrease: fator aplicado à taxa a cada penalidade (no máximo uma por cooldown segundos).
+    """
+
+    def __init__(self, rate=10.0, burst=10, state_path=None, min_rate=1.0, max_rate=50.0,
+                 increase=1.0, decrease=0.5, cooldown=1.0):
+        self.initial_rate = rate
+        self.burst = burst
+        self.state_path = state_path if fcntl is not None else None
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = None
+        if self.state_path:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+
+    def _initial_state(self):
+        return {'tokens': float(self.burst), 'updated': time.time(), 'rate': float(self.initial_rate),
+                'blocked_until': 0.0, 'last_decrease': 0.0}
+
+    @contextmanager
+    def _locked_state(self):
+        """Estado do balde sob trava (thread e, com state_path, arquivo)."""
+        with self._lock:
+            if not self.state_path:
+                if self._state is None:
+                    self._state = self._initial_state()
+                yield self._state
+                return
+
+            with open(f"{self.state_path}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.state_path, encoding='utf-8') as f:
+                            state = json.load(f)
+                    except (OSError, ValueError):
+                        state = self._initial_state()
+                    yield state
+                    tmp_path = f"{self.state_path}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.state_path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        state['rate'] = min(self.max_rate, max(self.min_rate, state['rate']))
+        elapsed = max(0.0, now - state['updated'])
+        state['tokens'] = min(float(self.burst), state['tokens'] + elapsed * state['rate'])
+        state['updated'] = now
+
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível. Retorna o tempo de espera (s)."""
+        waited = 0.0
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                self._refill(state, now)
+                if now < state['blocked_until']:
+                    wait = state['blocked_until'] - now
+                elif state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    return waited
+                else:
+                    wait = (1 - state['tokens']) / state['rate']
+            time.sleep(wait)
+            waited += wait
+
+    def reward(self):
+        """Resposta bem-sucedida: aumento aditivo da taxa."""
+        with self._locked_state() as state:
+            state['rate'] = min(self.max_rate, state['rate'] + self.increase / max(state['rate'], 1.0))
+
+    def penalize(self, retry_after=None):
+        """Resposta 429/503: redução multiplicativa da taxa e pausa global pelo Retry-After."""
+        with self._locked_state() as state:
+            now = time.time()
+            if now - state['last_decrease'] >= self.cooldown:
+                state['rate'] = max(self.min_rate, state['rate'] * self.decrease)
+                state['last_decrease'] = now
+                logger.warning(f"Limite de taxa atingido; taxa reduzida para {state['rate']:.2f} req/s")
+            state['tokens'] = min(state['tokens'], 0.0)
+            if retry_after:
+                state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+
+    @property
+    def rate(self):
+        with self._locked_state() as state:
+            return state['rate']
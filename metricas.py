@@ -0,0 +1,312 @@
+"""
+Instrumentação do pipeline: chamadas HTTP por endpoint e etapas das tarefas
+
+Por padrão o registrador é um NullRecorder (sem custo além de uma chamada
+vazia). Com um MetricsRecorder ativo, são medidos:
+
+- por endpoint: chamadas por status, novas tentativas, bytes e histograma de latência;
+- por etapa (extract, transform, check, write...): tempo total e exclusivo
+  (sem as etapas internas), linhas de entrada/saída e pico de RSS do processo.
+
+O resultado é exportado como relatório JSON e como arquivo texto do Prometheus
+(para o textfile collector do node_exporter).
+"""
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # indisponível fora de sistemas Unix
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Limites (s) do histograma de latência das chamadas HTTP
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Segmentos de caminho que são identificadores (ex.: 204554, 2265603-43)
+_ID_SEGMENT = re.compile(r'^[\d-]+$')
+
+def endpoint_key(endpoint):
+    """Agrupa endpoints com identificadores: proposicoes/123/votacoes -> proposicoes/{id}/votacoes."""
+    return '/'.join('{id}' if _ID_SEGMENT.match(part) else part for part in endpoint.strip('/').split('/'))
+
+def peak_rss_bytes():
+    """Pico de memória residente do processo até o momento (None se indisponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KiB; macOS, em bytes
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+class _NullStage:
+    __slots__ = ('rows_in', 'rows_out')
+
+    def __init__(self):
+        self.rows_in = None
+        self.rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+class NullRecorder:
+    """Registrador padrão: não mede nada."""
+
+    enabled = False
+
+    def record_request(self, endpoint, status, seconds, bytes_received=0, retries=0):
+        pass
+
+    def stage(self, name, rows_in=None):
+        return _NullStage()
+
+    def to_dict(self):
+        return {}
+
+class _Stage:
+    def __init__(self, recorder, name, rows_in):
+        self.recorder = recorder
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.child_seconds = 0.0
+
+    def __enter__(self):
+        self.recorder._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        stack = self.recorder._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_seconds += elapsed
+        self.recorder._add_stage(self, elapsed, failed=exc_type is not None)
+        return False
+
+class MetricsRecorder(NullRecorder):
+    """Acumula métricas de chamadas HTTP e etapas (seguro entre threads).
+
+    Uso:
+        recorder = MetricsRecorder('transform_deputies')
+        with recorder.stage('transform', rows_in=len(df)) as stage:
+            df = clean(df)
+            stage.rows_out = len(df)
+        recorder.write_json('run.json'); recorder.write_prometheus('camara.prom')
+
+    Etapas com o mesmo nome são somadas (ex.: uma por bloco). Etapas podem ser
+    aninhadas; `self_seconds` exclui o tempo das etapas internas da mesma thread.
+    """
+
+    enabled = True
+
+    def __init__(self, name='camara_etl'):
+        self.name = name
+        self.started_at = datetime.now()
+        self.http = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def record_request(self, endpoint, status, seconds, bytes_received=0, retries=0):
+        key = endpoint_key(endpoint)
+        status = str(status)
+        with self._lock:
+            entry = self.http.get(key)
+            if entry is None:
+                entry = self.http[key] = {
+                    'calls': 0, 'status': {}, 'retries': 0, 'bytes': 0,
+                    'seconds': 0.0, 'max_seconds': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS),
+                }
+            entry['calls'] += 1
+            entry['status'][status] = entry['status'].get(status, 0) + 1
+            entry['retries'] += retries
+            entry['bytes'] += bytes_received
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            for i, limit in enumerate(LATENCY_BUCKETS):
+                if seconds <= limit:
+                    entry['buckets'][i] += 1
+
+    def stage(self, name, rows_in=None):
+        return _Stage(self, name, rows_in)
+
+    def _add_stage(self, stage, elapsed, failed=False):
+        peak = peak_rss_bytes()
+        with self._lock:
+            entry = self.stages.get(stage.name)
+            if entry is None:
+                entry = self.stages[stage.name] = {
+                    'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0,
+                    'rows_in': 0, 'rows_out': 0, 'peak_rss_bytes': None, 'failures': 0,
+                }
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+            entry['self_seconds'] += elapsed - stage.child_seconds
+            entry['rows_in'] += stage.rows_in or 0
+            entry['rows_out'] += stage.rows_out or 0
+            entry['failures'] += int(failed)
+            if peak is not None:
+                entry['peak_rss_bytes'] = max(entry['peak_rss_bytes'] or 0, peak)
+
+    def to_dict(self):
+        with self._lock:
+            http = {
+                key: {**entry, 'status': dict(entry['status']),
+                      'buckets': dict(zip(LATENCY_BUCKETS, entry['buckets']))}
+                for key, entry in self.http.items()
+            }
+            stages = {key: dict(entry) for key, entry in self.stages.items()}
+        return {
+            'name': self.name,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'http': http,
+            'stages': stages,
+        }
+
+    def write_json(self, path):
+        """Grava o relatório da execução em JSON."""
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2, default=str))
+        return path
+
+    def prometheus_text(self):
+        """Métricas no formato de exposição de texto do Prometheus."""
+        report = self.to_dict()
+        task = _label(report['name'])
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        http = report['http']
+        metric('camara_http_requests_total', 'counter', 'Chamadas HTTP por endpoint e status.', [
+            f'camara_http_requests_total{{task="{task}",endpoint="{_label(key)}",status="{_label(status)}"}} {count}'
+            for key, entry in http.items() for status, count in entry['status'].items()
+        ])
+        metric('camara_http_retries_total', 'counter', 'Novas tentativas por endpoint.', [
+            f'camara_http_retries_total{{task="{task}",endpoint="{_label(key)}"}} {entry["retries"]}'
+            for key, entry in http.items()
+        ])
+        metric('camara_http_response_bytes_total', 'counter', 'Bytes recebidos por endpoint.', [
+            f'camara_http_response_bytes_total{{task="{task}",endpoint="{_label(key)}"}} {entry["bytes"]}'
+            for key, entry in http.items()
+        ])
+        histogram = []
+        for key, entry in http.items():
+            labels = f'task="{task}",endpoint="{_label(key)}"'
+            for limit, count in entry['buckets'].items():
+                histogram.append(f'camara_http_request_duration_seconds_bucket{{{labels},le="{limit}"}} {count}')
+            histogram.append(f'camara_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["calls"]}')
+            histogram.append(f'camara_http_request_duration_seconds_sum{{{labels}}} {entry["seconds"]:.6f}')
+            histogram.append(f'camara_http_request_duration_seconds_count{{{labels}}} {entry["calls"]}')
+        metric('camara_http_request_duration_seconds', 'histogram', 'Latência das chamadas HTTP (com novas tentativas).',
+               histogram)
+
+        stages = report['stages']
+        for field, name, help_text in [
+            ('seconds', 'camara_stage_duration_seconds', 'Tempo total da etapa.'),
+            ('self_seconds', 'camara_stage_self_seconds', 'Tempo da etapa sem as etapas internas.'),
+            ('rows_in', 'camara_stage_rows_in', 'Linhas de entrada da etapa.'),
+            ('rows_out', 'camara_stage_rows_out', 'Linhas de saída da etapa.'),
+            ('peak_rss_bytes', 'camara_stage_peak_rss_bytes', 'Pico de RSS do processo ao fim da etapa.'),
+        ]:
+            metric(name, 'gauge', help_text, [
+                f'{name}{{task="{task}",stage="{_label(key)}"}} {entry[field]}'
+                for key, entry in stages.items() if entry[field] is not None
+            ])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Grava as métricas para o textfile collector (substituição atômica do arquivo)."""
+        _atomic_write(path, self.prometheus_text())
+        return path
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+_recorder = NullRecorder()
+
+_END = object()
+
+def get_recorder():
+    """Registrador ativo (NullRecorder se a instrumentação estiver desligada)."""
+    return _recorder
+
+def set_recorder(recorder):
+    """Define o registrador ativo e devolve o anterior."""
+    global _recorder
+    previous = _recorder
+    _recorder = recorder if recorder is not None else NullRecorder()
+    return previous
+
+def timed_iter(iterable, name):
+    """Gera os itens de iterable medindo a produção de cada um como uma etapa `name`.
+
+    A etapa é encerrada antes de cada yield, para que o tempo de quem consome
+    não seja atribuído a ela. Itens com len() contam como linhas de saída.
+    """
+    iterator = iter(iterable)
+    while True:
+        with get_recorder().stage(name) as stage:
+            item = next(iterator, _END)
+            if item is not _END and hasattr(item, '__len__'):
+                stage.rows_out = len(item)
+        if item is _END:
+            return
+        yield item
+
+def instrument(func, output_dir, name=None):
+    """Executa func com um MetricsRecorder ativo e grava os relatórios em output_dir.
+
+    Sem output_dir, devolve func inalterada (instrumentação desligada).
+    Gera {output_dir}/{nome}_{AAAAMMDDHHMMSS}.json e {output_dir}/camara_etl_{nome}.prom;
+    instâncias mapeadas do Airflow recebem o índice no nome (ex.: extract_votes_shard_3).
+    """
+    if not output_dir:
+        return func
+    base_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        map_index = getattr(kwargs.get('ti'), 'map_index', -1)
+        name = f"{base_name}_{map_index}" if isinstance(map_index, int) and map_index >= 0 else base_name
+        recorder = MetricsRecorder(name)
+        previous = set_recorder(recorder)
+        try:
+            with recorder.stage(name):
+                return func(*args, **kwargs)
+        finally:
+            set_recorder(previous)
+            stamp = recorder.started_at.strftime('%Y%m%d%H%M%S')
+            try:
+                recorder.write_json(os.path.join(output_dir, f"{name}_{stamp}.json"))
+                recorder.write_prometheus(os.path.join(output_dir, f"camara_etl_{name}.prom"))
+            except OSError as e:
+                logger.warning(f"Falha ao gravar métricas de {name}: {e}")
+
+    return wrapper
@@ -0,0 +1,793 @@
+"""
+Implementação das tarefas da DAG camara_etl_pipeline
+
+Separada de camara_etl.py para que a análise periódica da DAG pelo agendador
+não importe pandas, numpy, requests nem os módulos do pipeline: cada tarefa
+importa este módulo apenas ao ser executada (camara_etl.task_callable).
+"""
+from datetime import datetime
+import os
+import logging
+
+from airflow.providers.postgres.hooks.postgres import PostgresHook
+
+from utils.api_cliente import CamaraApiClient, CamaraApiError
+from utils.cache_api import ResponseCache
+from utils.limitador import RateLimiter
+from utils.incremental import WatermarkStore, iter_date_windows, merge_incremental
+from utils.armazenamento import get_storage
+from utils.carga_postgres import COPY_CHUNK_ROWS, delete_rows, ensure_schema, upsert_frames
+from utils.agregados import publish_aggregate, update_aggregate
+from utils.coesao import CohesionEngine
+from utils.cdc import CDC_COLUMNS, DELETE, OPERATION, ChangeCapture
+from utils.consultas import mark_published, publish_current
+from utils.metricas import get_recorder
+from utils.transformacoes import (
+    clean_deputies_data, 
+    clean_propositions_data, 
+    process_votes_data,
+    flatten_vote_details,
+    flatten_deputy_details,
+    compact_vote_details,
+    create_analytical_view
+)
+from utils.check_qualidade import (
+    check_votes_data,
+    check_analytical_view,
+    DEPUTIES_VALIDATOR,
+    PROPOSITIONS_VALIDATOR,
+    VOTE_DETAILS_VALIDATOR
+)
+
+DATA_DIR = '/opt/airflow/data'
+RAW_DIR = f'{DATA_DIR}/raw'
+PROCESSED_DIR = f'{DATA_DIR}/processed'
+FINAL_DIR = f'{DATA_DIR}/final'
+CACHE_DIR = os.environ.get('CAMARA_CACHE_DIR', f'{DATA_DIR}/cache')
+STATE_DIR = f'{DATA_DIR}/state'
+WATERMARKS_PATH = f'{STATE_DIR}/watermarks.json'
+COHESION_STATE_PATH = f'{STATE_DIR}/coesao.npz'
+RATE_LIMITER_PATH = f'{STATE_DIR}/rate_limiter.json'
+# Marcador lido pela camada de consulta do dashboard (utils.consultas) para descartar o cache
+PUBLICATION_PATH = f'{STATE_DIR}/publicacao.json'
+
+# Modo de extração: 'full' (snapshot completo) ou 'incremental' (apenas o delta desde a última execução)
+EXTRACTION_MODE = os.environ.get('CAMARA_EXTRACTION_MODE', 'full')
+
+# Cache de respostas da API (desligado com CAMARA_CACHE_ENABLED=0)
+CACHE_ENABLED = os.environ.get('CAMARA_CACHE_ENABLED', '1') == '1'
+
+# Formato de armazenamento das camadas raw/processed/final: 'parquet' ou 'csv'
+STORAGE_FORMAT = os.environ.get('CAMARA_STORAGE_FORMAT', 'parquet')
+
+# Colunas lidas na atualização dos agregados materializados (projeção na leitura)
+ANALYTICS_COLUMNS = {
+    'deputados': ['id', 'siglaPartido', 'siglaUf', 'regiao'],
+    'proposicoes': ['id', 'siglaTipo', 'dataApresentacao'],
+}
+
+# Linhas por bloco nas transformações em streaming (limita a memória dos workers)
+TRANSFORM_CHUNK_ROWS = int(os.environ.get('CAMARA_TRANSFORM_CHUNK_ROWS', 100000))
+
+# Votações por lote na coleta de votos individuais (limita a memória por bloco gravado)
+VOTE_DETAILS_BATCH_SIZE = int(os.environ.get('CAMARA_VOTE_DETAILS_BATCH_SIZE', 500))
+
+# Conexão do Airflow com o banco PostgreSQL de destino
+POSTGRES_CONN_ID = os.environ.get('CAMARA_POSTGRES_CONN_ID', 'camara_postgres')
+
+# Taxa de requisições à API compartilhada por todas as tarefas do worker (req/s; 0 desliga).
+# A taxa inicial se adapta às respostas 429/503 dentro de [1, CAMARA_API_MAX_RATE].
+API_RATE = float(os.environ.get('CAMARA_API_RATE', 10))
+API_BURST = int(os.environ.get('CAMARA_API_BURST', 10))
+API_MAX_RATE = float(os.environ.get('CAMARA_API_MAX_RATE', 50))
+
+# Requisições simultâneas na extração de votações
+VOTES_MAX_WORKERS = int(os.environ.get('CAMARA_VOTES_MAX_WORKERS', 8))
+
+# Proposições por lote (instância mapeada de extract_votes_shard)
+VOTES_SHARD_SIZE = int(os.environ.get('CAMARA_VOTES_SHARD_SIZE', 500))
+
+# Requisições simultâneas na coleta de detalhes de deputados
+DEPUTY_DETAILS_MAX_WORKERS = int(os.environ.get('CAMARA_DEPUTY_DETAILS_MAX_WORKERS', 8))
+
+# Campos da lista de deputados cuja alteração provoca nova coleta dos detalhes
+DEPUTY_LIST_COLUMNS = ['nome', 'siglaPartido', 'siglaUf', 'idLegislatura', 'email', 'urlFoto']
+
+# Idade máxima (dias) dos detalhes reaproveitados; mudanças só nos detalhes (escolaridade,
+# gabinete, situação...) são coletadas ao expirar. 0 coleta todos os detalhes a cada execução
+DEPUTY_DETAILS_MAX_AGE_DAYS = int(os.environ.get('CAMARA_DEPUTY_DETAILS_MAX_AGE_DAYS', 7))
+
+# Entidades com captura de alterações: tarefa -> (entidade, se chaves ausentes do snapshot são exclusões)
+# A lista de deputados é completa; as proposições extraídas cobrem só o ano (ou o delta)
+CDC_TASKS = {
+    'cdc_deputies': ('deputados', True),
+    'cdc_propositions': ('proposicoes', False),
+}
+
+# Filtro de leitura dos eventos de CDC que trazem o registro completo (inclusões e alterações)
+UPSERT_EVENTS = [(OPERATION, '!=', DELETE)]
+
+# Colunas mantidas de votacoes/{id}/orientacoes
+ORIENTATION_COLUMNS = ['idVotacao', 'siglaPartidoBloco', 'codTipoLideranca', 'orientacaoVoto']
+
+def extraction_date():
+    """Data da extração usada para nomear/particionar os dados (AAAAMMDD)."""
+    return datetime.now().strftime('%Y%m%d')
+
+def build_client(**client_kwargs):
+    """Cria o cliente da API, com cache em disco e limite de taxa compartilhado quando habilitados."""
+    cache = ResponseCache(CACHE_DIR) if CACHE_ENABLED else None
+    rate_limiter = None
+    if API_RATE > 0:
+        rate_limiter = RateLimiter(rate=API_RATE, burst=API_BURST, max_rate=API_MAX_RATE,
+                                   state_path=RATE_LIMITER_PATH)
+    return CamaraApiClient(cache=cache, rate_limiter=rate_limiter, **client_kwargs)
+
+def extract_deputies(**kwargs):
+    """Extrai dados de deputados da API da Câmara."""
+    client = build_client()
+    deputies_df = client.get_deputies()
+    
+    if deputies_df is not None:
+        # Salvar dados brutos
+        location = get_storage(STORAGE_FORMAT, DATA_DIR).write(
+            deputies_df, 'raw', 'deputados', extraction_date()
+        )
+        
+        logging.info(f"Dados de deputados salvos em {location}")
+        return location
+    else:
+        raise ValueError("Falha ao extrair dados de deputados")
+
+def enrich_deputies(**kwargs):
+    """Coleta os detalhes (ultimoStatus, gabinete, nascimento etc.) dos deputados novos, alterados
+    ou com detalhes coletados há mais de DEPUTY_DETAILS_MAX_AGE_DAYS dias."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    import pandas as pd
+    deputies_df = storage.read(ti.xcom_pull(task_ids='extract_deputies'))
+    current = pd.DataFrame({
+        'id': deputies_df['id'].to_numpy(),
+        'hash_lista': pd.util.hash_pandas_object(deputies_df.reindex(columns=DEPUTY_LIST_COLUMNS),
+                                                 index=False).to_numpy(),
+    })
+    
+    # Deputados cujo registro na lista não mudou reaproveitam os detalhes da execução anterior,
+    # desde que coletados há menos de DEPUTY_DETAILS_MAX_AGE_DAYS dias
+    collected_at = datetime.now()
+    location = storage.location('raw', 'deputados_detalhes')
+    previous_df = storage.read(location) if storage.exists(location) else None
+    if previous_df is not None and 'hash_lista' in previous_df.columns:
+        known = previous_df.drop_duplicates(subset='id', keep='last').set_index('id').reindex(current['id'])
+        same_list = known['hash_lista'].to_numpy() == current['hash_lista'].to_numpy()
+        if 'coletado_em' in known.columns:
+            collected = pd.to_datetime(known['coletado_em'], errors='coerce', format='ISO8601')
+            fresh = (collected > collected_at - pd.Timedelta(days=DEPUTY_DETAILS_MAX_AGE_DAYS)).to_numpy()
+        else:
+            fresh = False
+        unchanged = pd.Series(same_list & fresh, index=current.index)
+        changed_ids = current.loc[known['hash_lista'].notna().to_numpy() & ~same_list, 'id'].tolist()
+    else:
+        unchanged = pd.Series(False, index=current.index)
+        changed_ids = []
+    deputy_ids = current.loc[~unchanged, 'id'].tolist()
+    
+    client = build_client(pool_size=DEPUTY_DETAILS_MAX_WORKERS)
+    try:
+        # Os detalhes em cache (TTL de dias) podem ser anteriores à mudança na lista (ex.: troca
+        # de partido); sem a entrada, o novo hash_lista não fica gravado junto a detalhes antigos
+        if client.cache is not None:
+            for deputy_id in changed_ids:
+                client.cache.invalidate(f"deputados/{deputy_id}")
+        with get_recorder().stage('extract', rows_in=len(deputy_ids)) as stage:
+            results = client.get_deputy_details_many(deputy_ids, max_workers=DEPUTY_DETAILS_MAX_WORKERS)
+            stage.rows_out = sum(1 for details in results if details)
+    finally:
+        client.close()
+    
+    failures = [deputy_id for deputy_id, details in zip(deputy_ids, results) if not details]
+    if failures:
+        logging.warning(f"Falha ao coletar detalhes de {len(failures)} deputados: {failures[:20]}")
+    
+    # Deputados com detalhes novos são transformados mesmo sem alteração na lista (ex.: coleta
+    # que falhou na execução anterior ou detalhes expirados)
+    ti.xcom_push(key='fetched_ids', value=[deputy_id for deputy_id, details in zip(deputy_ids, results)
+                                           if details])
+    
+    fetched = [details for details in results if details]
+    if fetched:
+        with get_recorder().stage('transform', rows_in=len(fetched)) as stage:
+            fetched_df = flatten_deputy_details(pd.DataFrame(fetched)).astype({'id': current['id'].dtype})
+            fetched_df['coletado_em'] = collected_at
+            stage.rows_out = len(fetched_df)
+        details_df = merge_incremental(previous_df, fetched_df.merge(current, on='id', how='inner'))
+    elif previous_df is not None:
+        details_df = previous_df
+    else:
+        raise ValueError("Falha ao coletar detalhes de deputados")
+    details_df = details_df[details_df['id'].isin(current['id'])]
+    
+    location = storage.write(details_df, 'raw', 'deputados_detalhes')
+    logging.info(f"Detalhes de {len(deputy_ids)} deputados coletados, "
+                 f"{int(unchanged.sum())} reaproveitados; salvos em {location}")
+    return location
+
+def extract_propositions(**kwargs):
+    """Extrai dados de proposições da API da Câmara."""
+    if EXTRACTION_MODE == 'incremental':
+        return extract_propositions_incremental(**kwargs)
+    
+    client = build_client()
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    # Extrair proposições do ano atual (todas as páginas, gravadas direto em disco)
+    current_year = datetime.now().year
+    
+    try:
+        location, total = storage.write_frames(
+            client.iter_frames("proposicoes", params={"ano": current_year}),
+            'raw', 'proposicoes', extraction_date(), partition_cols=['ano']
+        )
+    except CamaraApiError as e:
+        raise ValueError("Falha ao extrair dados de proposições") from e
+    finally:
+        client.close()
+    
+    if not total:
+        raise ValueError("Falha ao extrair dados de proposições")
+    
+    logging.info(f"Dados de proposições salvos em {location}")
+    return location
+
+def extract_propositions_incremental(**kwargs):
+    """Extrai apenas proposições novas ou alteradas desde a marca d'água e as incorpora ao consolidado."""
+    ti = kwargs['ti']
+    client = build_client()
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    today = datetime.now().date()
+    since = WatermarkStore(WATERMARKS_PATH).get('proposicoes', f"{today.year}-01-01")
+    
+    import pandas as pd
+    # Buscar o delta em janelas de datas de tramitação
+    deltas = []
+    for window_start, window_end in iter_date_windows(since, today):
+        window_df = client.get_propositions(start_date=window_start, end_date=window_end)
+        if window_df is None:
+            client.close()
+            raise ValueError(f"Falha ao extrair proposições de {window_start} a {window_end}")
+        deltas.append(window_df)
+    client.close()
+    
+    delta_df = pd.concat(deltas, ignore_index=True)
+    if delta_df.empty:
+        delta_df = pd.DataFrame(columns=['id'])
+    delta_df = delta_df.drop_duplicates(subset='id', keep='last')
+    
+    delta_location = storage.write(delta_df, 'raw', 'proposicoes_delta', extraction_date())
+    
+    # Incorporar o delta ao conjunto consolidado
+    location = storage.location('raw', 'proposicoes_consolidado')
+    existing_df = storage.read(location) if storage.exists(location) else None
+    storage.write(merge_incremental(existing_df, delta_df), 'raw', 'proposicoes_consolidado',
+                  partition_cols=['ano'])
+    
+    # A marca d'água só é gravada ao fim de uma execução bem-sucedida (commit_watermarks)
+    ti.xcom_push(key='delta_file', value=delta_location)
+    ti.xcom_push(key='watermark', value=today.isoformat())
+    
+    logging.info(f"{len(delta_df)} proposições novas ou alteradas desde {since}; consolidado em {location}")
+    return location
+
+def capture_changes(ti, task_id, location):
+    """Compara o snapshot em location com a última execução confirmada e grava apenas o delta.
+
+    Retorna o local dos eventos (None se nada mudou). A confirmação fica para
+    commit_watermarks, ao fim de uma execução bem-sucedida.
+    """
+    entity, deletes = CDC_TASKS[task_id]
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    committed = WatermarkStore(WATERMARKS_PATH).get(f'cdc_{entity}')
+    
+    snapshot_df = storage.read(location)
+    with get_recorder().stage('transform', rows_in=len(snapshot_df)) as stage:
+        changes, events_location = ChangeCapture(storage, entity, deletes=deletes).capture(
+            snapshot_df, stamp, committed)
+        stage.rows_out = len(changes)
+    
+    ti.xcom_push(key='cdc_stamp', value=stamp)
+    ti.xcom_push(key='cdc_committed', value=committed)
+    logging.info(f"Alterações de {entity}: {changes.summary()}; eventos em {events_location}")
+    return events_location
+
+def cdc_deputies(**kwargs):
+    """Captura inclusões, alterações e exclusões na lista de deputados."""
+    ti = kwargs['ti']
+    return capture_changes(ti, 'cdc_deputies', ti.xcom_pull(task_ids='extract_deputies'))
+
+def cdc_propositions(**kwargs):
+    """Captura inclusões e alterações nas proposições extraídas (no modo incremental, no delta)."""
+    ti = kwargs['ti']
+    location = (ti.xcom_pull(task_ids='extract_propositions', key='delta_file')
+                or ti.xcom_pull(task_ids='extract_propositions'))
+    return capture_changes(ti, 'cdc_propositions', location)
+
+def deleted_keys(storage, events_location, key='id'):
+    """Chaves excluídas registradas nos eventos de CDC (None se não houver eventos)."""
+    if not events_location:
+        return None
+    return storage.read(events_location, columns=[key], filters=[(OPERATION, '==', DELETE)])
+
+def plan_vote_shards(**kwargs):
+    """Divide as proposições em lotes para a extração de votações (um mapeamento por lote)."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Obter local das proposições (no modo incremental, apenas o delta)
+    if EXTRACTION_MODE == 'incremental':
+        propositions_location = ti.xcom_pull(task_ids='extract_propositions', key='delta_file')
+    else:
+        propositions_location = ti.xcom_pull(task_ids='extract_propositions')
+    
+    # Ler apenas os ids das proposições (ordenados, para lotes estáveis entre novas tentativas)
+    propositions_df = storage.read(propositions_location, columns=['id'])
+    proposition_ids = sorted(int(prop_id) for prop_id in propositions_df['id'].dropna().unique())
+    
+    shards = [
+        {'shard': shard, 'proposition_ids': proposition_ids[start:start + VOTES_SHARD_SIZE]}
+        for shard, start in enumerate(range(0, len(proposition_ids), VOTES_SHARD_SIZE))
+    ]
+    logging.info(f"{len(proposition_ids)} proposições divididas em {len(shards)} lotes de até {VOTES_SHARD_SIZE}")
+    return shards
+
+def extract_votes_shard(shard, proposition_ids, **kwargs):
+    """Extrai as votações de um lote de proposições e grava a partição do lote."""
+    client = build_client(pool_size=VOTES_MAX_WORKERS)
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    import pandas as pd
+    # Extrair votações do lote, com paralelismo limitado
+    try:
+        with get_recorder().stage('extract', rows_in=len(proposition_ids)):
+            results = client.get_votes_many(proposition_ids, max_workers=VOTES_MAX_WORKERS)
+    finally:
+        client.close()
+    
+    # Uma falha refaz apenas este lote (nova tentativa da instância mapeada)
+    failures = [prop_id for prop_id, votes_df in zip(proposition_ids, results) if votes_df is None]
+    if failures:
+        raise ValueError(f"Falha ao extrair votações de {len(failures)} proposições do lote {shard}: "
+                         f"{failures[:20]}")
+    
+    all_votes = []
+    for prop_id, votes_df in zip(proposition_ids, results):
+        if not votes_df.empty:
+            votes_df['proposicaoId'] = prop_id
+            all_votes.append(votes_df)
+    
+    if not all_votes:
+        logging.info(f"Lote {shard}: nenhuma votação em {len(proposition_ids)} proposições")
+        return None
+    
+    location = storage.write(pd.concat(all_votes, ignore_index=True), 'raw', f'votacoes_lotes/{shard:05d}',
+                             extraction_date())
+    logging.info(f"Lote {shard}: votações de {len(all_votes)} proposições salvas em {location}")
+    return location
+
+def extract_votes(**kwargs):
+    """Consolida as partições gravadas pelos lotes de extract_votes_shard."""
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    ti = kwargs['ti']
+    
+    import pandas as pd
+    # Locais gravados pelas instâncias mapeadas (lotes sem votações devolvem None)
+    shard_locations = [location for location in ti.xcom_pull(task_ids='extract_votes_shard') or [] if location]
+    
+    consolidated_location = storage.location('raw', 'votacoes_consolidado')
+    if shard_locations:
+        # Salvar dados brutos
+        if EXTRACTION_MODE == 'incremental':
+            combined_votes = pd.concat([storage.read(location) for location in shard_locations], ignore_index=True)
+            existing_df = storage.read(consolidated_location) if storage.exists(consolidated_location) else None
+            location = storage.write(merge_incremental(existing_df, combined_votes), 'raw', 'votacoes_consolidado')
+            # Só as votações destes lotes (novas ou alteradas) têm os votos coletados novamente
+            ti.xcom_push(key='delta', value=shard_locations)
+        else:
+            location, _ = storage.write_frames((storage.read(location) for location in shard_locations),
+                                               'raw', 'votacoes', extraction_date())
+        
+        logging.info(f"Votações de {len(shard_locations)} lotes consolidadas em {location}")
+        return location
+    else:
+        logging.warning("Nenhum dado de votação encontrado")
+        if EXTRACTION_MODE == 'incremental' and storage.exists(consolidated_location):
+            return consolidated_location
+        return None
+
+def extract_vote_details(**kwargs):
+    """Coleta os votos individuais dos deputados nas votações extraídas.
+
+    No modo incremental, apenas as votações dos lotes desta execução são
+    consultadas e seus votos são incorporados a raw/votos_consolidado.
+    """
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    votes_location = ti.xcom_pull(task_ids='extract_votes')
+    if not votes_location:
+        logging.warning("Nenhuma votação para coletar votos")
+        return None
+    
+    import pandas as pd
+    if EXTRACTION_MODE == 'incremental':
+        delta_locations = ti.xcom_pull(task_ids='extract_votes', key='delta') or []
+        if not delta_locations:
+            consolidated_location = storage.location('raw', 'votos_consolidado')
+            logging.info("Nenhuma votação nova ou alterada; votos consolidados mantidos")
+            return consolidated_location if storage.exists(consolidated_location) else None
+        votes_df = pd.concat([storage.read(location) for location in delta_locations], ignore_index=True)
+    else:
+        votes_df = storage.read(votes_location)
+    if not check_votes_data(votes_df):
+        raise ValueError("Falha na verificação de qualidade dos dados de votações")
+    vote_ids = votes_df['id'].drop_duplicates().tolist()
+    
+    client = build_client(pool_size=VOTES_MAX_WORKERS)
+    validation = VOTE_DETAILS_VALIDATOR.session()
+    failures = []
+    orientation_frames = []
+    
+    def iter_batches():
+        # Busca concorrente por lote; cada lote é validado e gravado antes do próximo
+        for start in range(0, len(vote_ids), VOTE_DETAILS_BATCH_SIZE):
+            batch = vote_ids[start:start + VOTE_DETAILS_BATCH_SIZE]
+            with get_recorder().stage('extract', rows_in=len(batch)):
+                results = client.get_vote_details_many(batch, max_workers=VOTES_MAX_WORKERS)
+                
+                # Orientações de bancada (inclui a do Governo), usadas no motor de coesão
+                orientations = client.get_vote_orientations_many(batch, max_workers=VOTES_MAX_WORKERS)
+            for vote_id, orientations_df in zip(batch, orientations):
+                if orientations_df is not None and not orientations_df.empty:
+                    orientations_df = orientations_df.reindex(columns=ORIENTATION_COLUMNS[1:])
+                    orientations_df.insert(0, 'idVotacao', vote_id)
+                    orientation_frames.append(orientations_df)
+            
+            with get_recorder().stage('transform') as stage:
+                frames = []
+                for vote_id, details_df in zip(batch, results):
+                    if details_df is None:
+                        failures.append(vote_id)
+                    elif not details_df.empty:
+                        frames.append(flatten_vote_details(details_df, vote_id))
+                batch_df = compact_vote_details(pd.concat(frames, ignore_index=True)) if frames else None
+                stage.rows_out = len(batch_df) if frames else 0
+            
+            if frames:
+                validation.update(batch_df)
+                yield batch_df
+    
+    try:
+        location, total = storage.write_frames(iter_batches(), 'raw', 'votos', extraction_date())
+    finally:
+        client.close()
+    
+    if failures:
+        logging.warning(f"Falha ao coletar votos de {len(failures)} votações: {failures[:20]}")
+    
+    report = validation.report()
+    report.log()
+    if total and not report.passed:
+        raise ValueError("Falha na verificação de qualidade dos votos")
+    
+    if orientation_frames:
+        orientations_location = storage.write(pd.concat(orientation_frames, ignore_index=True),
+                                              'raw', 'orientacoes', extraction_date())
+        ti.xcom_push(key='orientations', value=orientations_location)
+    
+    if EXTRACTION_MODE == 'incremental':
+        # Votações com falha mantêm os votos já consolidados
+        failed = set(failures)
+        return consolidate_vote_details(storage, location if total else None,
+                                        [vote_id for vote_id in vote_ids if vote_id not in failed])
+    
+    if not total:
+        logging.warning("Nenhum voto individual encontrado")
+        return None
+    
+    
+    logging.info(f"{total} votos de {len(vote_ids)} votações salvos em {location}")
+    return location
+
+def consolidate_vote_details(storage, delta_location, vote_ids):
+    """Incorpora os votos de uma execução incremental a raw/votos_consolidado, bloco a bloco.
+
+    Os votos já consolidados das votações em vote_ids são substituídos pelos de
+    delta_location. Retorna o local do consolidado (None se ficar vazio).
+    """
+    consolidated_location = storage.location('raw', 'votos_consolidado')
+    sources = []
+    if storage.exists(consolidated_location):
+        sources.append(storage.iter_read(consolidated_location, filters=[('idVotacao', 'not in', vote_ids)]))
+    if delta_location:
+        sources.append(storage.iter_read(delta_location))
+    
+    # Gravado ao lado do atual, que é lido durante a gravação, e renomeado no fim
+    frames = (chunk for chunks in sources for chunk in chunks)
+    location, total = storage.write_frames(frames, 'raw', 'votos_consolidado_novo')
+    storage.delete(consolidated_location)
+    if not total:
+        storage.delete(location)
+        logging.warning("Nenhum voto individual consolidado")
+        return None
+    os.replace(location, consolidated_location)
+    logging.info(f"Votos de {len(vote_ids)} votações incorporados; {total} votos em {consolidated_location}")
+    return consolidated_location
+
+def transform_in_chunks(storage, location, clean, validator, entity, partition_cols=None, filters=None,
+                        extra=()):
+    """Lê, transforma, valida e grava um conjunto bloco a bloco.
+
+    A unicidade entre blocos usa o índice ordenado de hashes da sessão de
+    validação (busca binária e intercalação linear dos hashes de cada bloco),
+    sem materializar o conjunto inteiro. Colunas de controle do CDC são
+    descartadas. extra: pares (local, filtros) de registros lidos após os de
+    location (que pode ser None). Retorna o local dos dados processados (None
+    se não houver linhas).
+    """
+    validation = validator.session()
+    sources = ([(location, filters)] if location else []) + list(extra)
+    
+    def iter_chunks():
+        for source_location, source_filters in sources:
+            for chunk in storage.iter_read(source_location, chunk_rows=TRANSFORM_CHUNK_ROWS,
+                                           filters=source_filters):
+                chunk = chunk.drop(columns=CDC_COLUMNS, errors='ignore')
+                with get_recorder().stage('transform', rows_in=len(chunk)) as stage:
+                    chunk = clean(chunk, inplace=True)
+                    stage.rows_out = len(chunk)
+                validation.update(chunk)
+                yield chunk
+    
+    output_location, total = storage.write_frames(iter_chunks(), 'processed', entity, extraction_date(),
+                                                  partition_cols=partition_cols)
+    
+    report = validation.report()
+    report.log()
+    if not report.passed:
+        raise ValueError(f"Falha na verificação de qualidade dos dados de {validator.dataset}")
+    
+    logging.info(f"{total} registros de {validator.dataset} processados")
+    return output_location if total else None
+
+def transform_deputies(**kwargs):
+    """Transforma os deputados incluídos ou alterados desde a última execução e os com detalhes novos."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Obter local das alterações de deputados
+    deputies_location = ti.xcom_pull(task_ids='cdc_deputies')
+    
+    # Deputados sem alteração na lista, mas com detalhes coletados nesta execução, vêm do snapshot
+    refreshed_ids = set(ti.xcom_pull(task_ids='enrich_deputies', key='fetched_ids') or [])
+    if deputies_location and refreshed_ids:
+        changed_ids = storage.read(deputies_location, columns=['id'], filters=UPSERT_EVENTS)['id']
+        refreshed_ids.difference_update(changed_ids.tolist())
+    extra = []
+    if refreshed_ids:
+        extra.append((ti.xcom_pull(task_ids='extract_deputies'), [('id', 'in', sorted(refreshed_ids))]))
+    
+    if not deputies_location and not extra:
+        logging.info("Nenhum deputado incluído ou alterado")
+        return None
+    
+    # Detalhes (um registro por deputado) incorporados a cada bloco
+    details_location = ti.xcom_pull(task_ids='enrich_deputies')
+    details_df = (storage.read(details_location).drop(columns=['hash_lista', 'coletado_em'], errors='ignore')
+                  if details_location else None)
+    
+    def clean(chunk, inplace=False):
+        if details_df is not None:
+            chunk = chunk.merge(details_df, on='id', how='left')
+        return clean_deputies_data(chunk, inplace=True)
+    
+    # Transformar, verificar e salvar em blocos
+    location = transform_in_chunks(storage, deputies_location, clean,
+                                   DEPUTIES_VALIDATOR, 'deputados_processados', filters=UPSERT_EVENTS,
+                                   extra=extra)
+    
+    logging.info(f"Dados de deputados processados salvos em {location}")
+    return location
+
+def transform_propositions(**kwargs):
+    """Transforma as proposições incluídas ou alteradas desde a última execução."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Obter local das alterações de proposições
+    propositions_location = ti.xcom_pull(task_ids='cdc_propositions')
+    if not propositions_location:
+        logging.info("Nenhuma proposição incluída ou alterada")
+        return None
+    
+    # Transformar, verificar e salvar em blocos
+    location = transform_in_chunks(storage, propositions_location, clean_propositions_data,
+                                   PROPOSITIONS_VALIDATOR, 'proposicoes_processadas', partition_cols=['ano'],
+                                   filters=UPSERT_EVENTS)
+    
+    logging.info(f"Dados de proposições processados salvos em {location}")
+    return location
+
+def create_analytics(**kwargs):
+    """Atualiza os agregados materializados de deputados e proposições e a visão analítica."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Apenas o delta capturado pelo CDC: inclusões/alterações (upsert) e deputados excluídos
+    deputies_location = ti.xcom_pull(task_ids='transform_deputies')
+    deputies_df = (storage.read(deputies_location, columns=ANALYTICS_COLUMNS['deputados'])
+                   if deputies_location else None)
+    deputies_deleted = deleted_keys(storage, ti.xcom_pull(task_ids='cdc_deputies'))
+    # Na primeira captura o delta é a lista completa (deputados ausentes saem do agregado)
+    deputies_snapshot = ti.xcom_pull(task_ids='cdc_deputies', key='cdc_committed') is None
+    
+    propositions_location = ti.xcom_pull(task_ids='transform_propositions')
+    propositions_df = (storage.read(propositions_location, columns=ANALYTICS_COLUMNS['proposicoes'])
+                       if propositions_location else None)
+    
+    # A visão usa apenas a contagem de votações
+    votes_location = ti.xcom_pull(task_ids='extract_votes')
+    votes_df = None
+    if votes_location:
+        votes_df = storage.read(votes_location, columns=['id'])
+    
+    rows_in = sum(len(df) for df in (deputies_df, propositions_df) if df is not None)
+    with get_recorder().stage('transform', rows_in=rows_in):
+        _, deputies_table = update_aggregate(storage, 'deputados_partido_uf', deputies_df,
+                                             snapshot=deputies_snapshot, deleted=deputies_deleted)
+        _, propositions_table = update_aggregate(storage, 'proposicoes_tipo_mes', propositions_df)
+        analytical_view = create_analytical_view(deputies_table, propositions_table, votes_df)
+    
+    # Verificar qualidade
+    if not check_analytical_view(analytical_view):
+        raise ValueError("Falha na verificação de qualidade da visão analítica")
+    
+    # Salvar visão analítica
+    location = storage.write(analytical_view, 'final', 'visao_analitica', extraction_date())
+    
+    # Exportar também em CSV para consumo externo
+    if storage.format != 'csv':
+        os.makedirs(FINAL_DIR, exist_ok=True)
+        storage.export_csv(location, f"{FINAL_DIR}/visao_analitica_{extraction_date()}.csv")
+    
+    logging.info(f"Visão analítica salva em {location}")
+    return location
+
+def analyze_votes(**kwargs):
+    """Calcula a coesão partidária e o alinhamento ao governo a partir dos votos individuais."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    vote_details_location = ti.xcom_pull(task_ids='extract_vote_details')
+    if not vote_details_location:
+        logging.warning("Sem votos individuais para analisar")
+        return None
+    
+    votes_df = storage.read(ti.xcom_pull(task_ids='extract_votes'), columns=['id'])
+    vote_details_df = storage.read(vote_details_location,
+                                   columns=['idVotacao', 'idDeputado', 'siglaPartido', 'voto', 'dataRegistroVoto'])
+    
+    with get_recorder().stage('transform', rows_in=len(vote_details_df)):
+        cohesion_df = process_votes_data(votes_df, vote_details_df)
+    if cohesion_df.empty:
+        raise ValueError("Falha na análise de coesão partidária")
+    
+    location = storage.write(cohesion_df.reset_index(), 'final', 'coesao_partidos', extraction_date())
+    
+    # Motor incremental: votações já contabilizadas em execuções anteriores são ignoradas
+    orientations_location = ti.xcom_pull(task_ids='extract_vote_details', key='orientations')
+    orientations_df = storage.read(orientations_location) if orientations_location else None
+    
+    with get_recorder().stage('transform', rows_in=len(vote_details_df)):
+        if os.path.exists(COHESION_STATE_PATH):
+            engine = CohesionEngine.load(COHESION_STATE_PATH)
+        else:
+            engine = CohesionEngine()
+        engine.update(vote_details_df, orientations_df)
+        engine.save(COHESION_STATE_PATH)
+        
+        votacao_metrics = engine.per_votacao()
+        outputs = {
+            'coesao_votacoes': votacao_metrics,
+            'coesao_por_partido': engine.per_party(votacao_metrics),
+            'coesao_mensal': engine.per_party_over_time(),
+            'alinhamento_deputados': engine.per_deputy(),
+        }
+    for entity, df in outputs.items():
+        storage.write(df, 'final', entity, extraction_date())
+    
+    # Agregados materializados para o dashboard (votações já contabilizadas são ignoradas)
+    with get_recorder().stage('transform', rows_in=len(vote_details_df)):
+        update_aggregate(storage, 'votos_partido_mes', vote_details_df)
+        publish_aggregate(storage, 'coesao_por_partido', outputs['coesao_por_partido'])
+        publish_aggregate(storage, 'coesao_mensal', outputs['coesao_mensal'])
+    
+    logging.info(f"Coesão partidária salva em {location}")
+    return location
+
+def publish_queries(**kwargs):
+    """Atualiza as tabelas de consulta do dashboard e sinaliza a nova publicação."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Deputados fora da lista em exercício saem da tabela atual
+    deputy_ids = storage.read(ti.xcom_pull(task_ids='extract_deputies'), columns=['id'])['id']
+    with get_recorder().stage('write'):
+        publish_current(storage, 'deputados', 'deputados_processados',
+                        ti.xcom_pull(task_ids='transform_deputies'), keys=deputy_ids)
+        publish_current(storage, 'proposicoes', 'proposicoes_processadas',
+                        ti.xcom_pull(task_ids='transform_propositions'))
+    
+    version = mark_published(PUBLICATION_PATH)
+    logging.info(f"Publicação {version} registrada em {PUBLICATION_PATH}")
+    return version
+
+def _counted(chunks, stage):
+    """Repassa os blocos somando suas linhas em stage.rows_in."""
+    for chunk in chunks:
+        stage.rows_in = (stage.rows_in or 0) + len(chunk)
+        yield chunk
+
+def load_postgres(**kwargs):
+    """Carrega os dados processados no PostgreSQL (COPY + upsert pela chave natural)."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    
+    # Tabela de destino -> tarefa que publica o local dos dados
+    sources = {
+        'deputados': 'transform_deputies',
+        'proposicoes': 'transform_propositions',
+        'votacoes': 'extract_votes',
+        'votos': 'extract_vote_details',
+    }
+    
+    conn = PostgresHook(postgres_conn_id=POSTGRES_CONN_ID).get_conn()
+    try:
+        ensure_schema(conn)
+        for table, task_id in sources.items():
+            location = ti.xcom_pull(task_ids=task_id)
+            if not location:
+                logging.warning(f"Sem dados para carregar em {table}")
+                continue
+            # Blocos lidos sob demanda: a memória acompanha o bloco, não a tabela (ex.: votos)
+            with get_recorder().stage('load') as stage:
+                chunks = storage.iter_read(location, chunk_rows=COPY_CHUNK_ROWS)
+                stage.rows_out = upsert_frames(conn, table, _counted(chunks, stage))
+        
+        # Deputados que deixaram a lista em exercício
+        deleted = deleted_keys(storage, ti.xcom_pull(task_ids='cdc_deputies'))
+        with get_recorder().stage('load', rows_in=0 if deleted is None else len(deleted)) as stage:
+            stage.rows_out = delete_rows(conn, 'deputados', deleted)
+    finally:
+        conn.close()
+
+def commit_watermarks(**kwargs):
+    """Confirma a captura de alterações e avança as marcas d'água após uma execução bem-sucedida."""
+    ti = kwargs['ti']
+    storage = get_storage(STORAGE_FORMAT, DATA_DIR)
+    store = WatermarkStore(WATERMARKS_PATH)
+    
+    # O índice do CDC gravado nesta execução passa a ser a base da próxima
+    for task_id, (entity, _) in CDC_TASKS.items():
+        stamp = ti.xcom_pull(task_ids=task_id, key='cdc_stamp')
+        if stamp:
+            store.set(f'cdc_{entity}', stamp)
+            ChangeCapture(storage, entity).commit(stamp, ti.xcom_pull(task_ids=task_id, key='cdc_committed'))
+    
+    if EXTRACTION_MODE != 'incremental':
+        logging.info("Modo de extração completo: marca d'água de proposições inalterada")
+        return
+    
+    watermark = ti.xcom_pull(task_ids='extract_propositions', key='watermark')
+    if watermark:
+        store.set('proposicoes', watermark)
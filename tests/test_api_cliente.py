@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import utils.api_cliente as api_cliente
+from utils.api_cliente import CamaraApiClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(body or {}).encode()
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise api_cliente.requests.exceptions.HTTPError(f"{self.status_code}")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(api_cliente.time, 'sleep', delays.append)
+    return delays
+
+
+def client_with(responses, **kwargs):
+    client = CamaraApiClient(**kwargs)
+    queue = list(responses)
+    client.session.get = lambda *args, **kw: queue.pop(0)
+    return client
+
+
+def test_retry_after_above_backoff_max_is_honoured(sleeps):
+    client = client_with([FakeResponse(429, headers={'Retry-After': '120'}),
+                          FakeResponse(200, {'dados': []})], backoff_max=30.0)
+    assert client.get_data('deputados') == {'dados': []}
+    assert sleeps == [120.0]
+    assert client.get_stats()['retries'] == 1
+
+
+def test_retry_after_is_capped_by_retry_after_max(sleeps):
+    client = client_with([FakeResponse(503, headers={'Retry-After': '7200'}),
+                          FakeResponse(200, {'dados': []})], backoff_max=30.0, retry_after_max=600.0)
+    client.get_data('deputados')
+    assert sleeps == [600.0]
@@ -0,0 +1,13 @@
+from utils.cache_api import ResponseCache
+
+
+def test_invalidate_removes_fresh_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put('deputados/1', None, {'dados': {'id': 1}})
+    size = cache.get_stats()['size_bytes']
+
+    assert size > 0
+    assert cache.invalidate('deputados/1')
+    assert cache.get('deputados/1') is None
+    assert cache.get_stats()['size_bytes'] == 0
+    assert not cache.invalidate('deputados/1')
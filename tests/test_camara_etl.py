@@ -0,0 +1,20 @@
+import os
+
+from benchmarks.run_benchmarks import heavy_modules, import_fresh
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_dag_file_does_not_import_heavy_modules():
+    # Processo novo: o pytest já carregou pandas e numpy neste
+    run = import_fresh('camara_etl', os.path.join(ROOT, 'camara_etl.py'), stub_airflow=True)
+
+    assert run['airflow'] == 'stub'
+    assert 'camara_etl' in run['modules']
+    assert heavy_modules(run['modules']) == []
+
+
+def test_task_module_is_where_heavy_imports_happen():
+    run = import_fresh('utils.tarefas_etl', os.path.join(ROOT, 'tarefas_etl.py'), stub_airflow=True)
+
+    assert 'pandas' in heavy_modules(run['modules'])
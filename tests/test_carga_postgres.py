@@ -0,0 +1,73 @@
+import logging
+
+import pandas as pd
+
+from utils.carga_postgres import _prepare, upsert_frames
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        self.log.append(sql.split()[0])
+        self.rowcount = 1
+
+    def copy_expert(self, sql, buffer):
+        self.log.append(('COPY', buffer.getvalue().count('\n')))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+
+def test_prepare_nulls_non_integral_values_instead_of_rounding(caplog):
+    df = pd.DataFrame({'id': [1, 2, 3], 'idLegislatura': [57.0, 1.5, None]})
+
+    with caplog.at_level(logging.WARNING):
+        prepared, columns = _prepare(df, 'deputados')
+
+    assert columns == ['id', 'idLegislatura']
+    assert str(prepared['idLegislatura'].dtype) == 'Int64'
+    assert prepared['idLegislatura'].tolist()[0] == 57
+    assert prepared['idLegislatura'].isna().tolist() == [False, True, True]
+    assert 'idLegislatura' in caplog.text
+
+
+def test_prepare_keeps_integral_floats():
+    df = pd.DataFrame({'id': [1.0, 2.0], 'idLegislatura': [56.0, 57.0]})
+
+    prepared, _ = _prepare(df, 'deputados')
+
+    assert prepared['id'].tolist() == [1, 2]
+    assert prepared['idLegislatura'].tolist() == [56, 57]
+
+
+def test_upsert_frames_loads_each_chunk_before_reading_the_next():
+    conn = FakeConnection()
+    read = []
+
+    def chunks():
+        for start in (1, 3):
+            read.append((start, len(conn.log)))
+            yield pd.DataFrame({'id': [start, start + 1], 'nome': ['a', 'b']})
+
+    assert upsert_frames(conn, 'deputados', chunks()) == 4
+    assert conn.log == ['CREATE', ('COPY', 2), 'INSERT', 'TRUNCATE',
+                        ('COPY', 2), 'INSERT', 'TRUNCATE', 'COMMIT']
+    # O segundo bloco só é lido depois do upsert do primeiro
+    assert read == [(1, 1), (3, 4)]
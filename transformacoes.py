@@ -5,6 +5,8 @@ from datetime import datetime
 import logging
 from dataclasses import dataclass
 
+from utils.esquemas import apply_schema
+
 logger = logging.getLogger(__name__)
 
 REGION_MAP = {
@@ -24,48 +26,140 @@ def validate_dataframe(df: pd.DataFrame, name: str) -> bool:
         return False
     return True
 
+# Formatos das colunas de data retornadas pela API (todas em ISO 8601).
+# Colunas fora deste mapa continuam com inferência de formato.
+DATE_FORMATS = {
+    'dataApresentacao': 'ISO8601',
+    'dataHoraRegistro': 'ISO8601',
+    'data': 'ISO8601',
+    'dataInicio': 'ISO8601',
+    'dataFim': 'ISO8601',
+    'dataNascimento': 'ISO8601',
+    'dataFalecimento': 'ISO8601',
+    'dataUltimoDespacho': 'ISO8601',
+}
+
+def _to_str(series: pd.Series) -> pd.Series:
+    """Equivalente vetorizado de series.apply(str)."""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series) \
+            and not pd.api.types.is_extension_array_dtype(series):
+        return pd.Series(series.to_numpy().astype(str), index=series.index)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # map em categorias devolve outra categoria, que não aceita concatenação
+        series = series.astype(object)
+    return series.map(str)
+
 def convert_date_columns(df: pd.DataFrame) -> pd.DataFrame:
     date_cols = [col for col in df.columns if "data" in col.lower()]
     for col in date_cols:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        df[col] = pd.to_datetime(df[col], errors='coerce', format=DATE_FORMATS.get(col))
     return df
 
-def clean_deputies_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_deputies_data(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     if not validate_dataframe(df, "deputados"):
         return pd.DataFrame()
     
-    result = df.copy()
+    # Cópia rasa: as colunas novas ou convertidas não alteram o DataFrame de entrada
+    result = df if inplace else df.copy(deep=False)
     result = convert_date_columns(result)
     
     if 'siglaUf' in result.columns:
         result['regiao'] = result['siglaUf'].map(REGION_MAP)
     
     result['data_processamento'] = datetime.now()
+    result = apply_schema(result, 'deputados', inplace=True)
     
     logger.info(f"Dados de deputados processados: {len(result)} registros")
     return result
 
-def clean_propositions_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_propositions_data(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     if not validate_dataframe(df, "proposições"):
         return pd.DataFrame()
     
-    result = df.copy()
+    # Cópia rasa: as colunas novas ou convertidas não alteram o DataFrame de entrada
+    result = df if inplace else df.copy(deep=False)
     result = convert_date_columns(result)
     
     if 'dataApresentacao' in result.columns:
         result['anoApresentacao'] = result['dataApresentacao'].dt.year
     
     if all(col in result.columns for col in ['siglaTipo', 'numero']):
-        result['identificacao'] = result.apply(
-            lambda x: f"{x['siglaTipo']} {str(x['numero'])}", axis=1
-        )
+        result['identificacao'] = _to_str(result['siglaTipo']) + ' ' + _to_str(result['numero'])
     
     result['data_processamento'] = datetime.now()
+    result = apply_schema(result, 'proposicoes', inplace=True)
     
     logger.info(f"Dados de proposições processados: {len(result)} registros")
     return result
 
+VOTE_DETAIL_COLUMNS = ['idVotacao', 'idDeputado', 'siglaPartido', 'siglaUf', 'voto', 'dataRegistroVoto']
+
+def flatten_vote_details(vote_details_df: pd.DataFrame, vote_id: Optional[str] = None) -> pd.DataFrame:
+    """Achata a resposta de votacoes/{id}/votos (deputado_ aninhado) em colunas."""
+    if not validate_dataframe(vote_details_df, "detalhes de votos"):
+        return pd.DataFrame(columns=VOTE_DETAIL_COLUMNS)
+    
+    deputies = pd.DataFrame(vote_details_df['deputado_'].tolist(), index=vote_details_df.index)
+    
+    result = pd.DataFrame({
+        'idVotacao': vote_id if vote_id is not None else vote_details_df.get('idVotacao'),
+        'idDeputado': deputies['id'],
+        'siglaPartido': deputies['siglaPartido'],
+        'siglaUf': deputies['siglaUf'],
+        'voto': vote_details_df['tipoVoto'],
+        'dataRegistroVoto': pd.to_datetime(vote_details_df['dataRegistroVoto'], errors='coerce', format='ISO8601'),
+    })
+    return result
+
+# Colunas de deputados/{id}: campos de primeiro nível, de ultimoStatus e de ultimoStatus.gabinete
+DEPUTY_DETAIL_FIELDS = ['id', 'nomeCivil', 'sexo', 'dataNascimento', 'dataFalecimento', 'ufNascimento',
+                        'municipioNascimento', 'escolaridade', 'urlWebsite']
+DEPUTY_STATUS_FIELDS = {
+    'nomeEleitoral': 'nomeEleitoral',
+    'situacao': 'situacao',
+    'condicaoEleitoral': 'condicaoEleitoral',
+    'descricaoStatus': 'descricaoStatus',
+    'data': 'dataUltimoStatus',
+}
+DEPUTY_OFFICE_FIELDS = {
+    'nome': 'gabineteNome',
+    'predio': 'gabinetePredio',
+    'sala': 'gabineteSala',
+    'andar': 'gabineteAndar',
+    'telefone': 'gabineteTelefone',
+    'email': 'gabineteEmail',
+}
+DEPUTY_DETAIL_COLUMNS = (DEPUTY_DETAIL_FIELDS + list(DEPUTY_STATUS_FIELDS.values())
+                         + list(DEPUTY_OFFICE_FIELDS.values()) + ['redeSocial'])
+
+def _unnest(series: pd.Series, fields: dict) -> pd.DataFrame:
+    """Expande uma coluna de dicionários (nulos viram {}) nas colunas renomeadas de fields."""
+    records = [value if isinstance(value, dict) else {} for value in series]
+    nested = pd.DataFrame.from_records(records, index=series.index, columns=list(fields))
+    return nested.rename(columns=fields)
+
+def flatten_deputy_details(details_df: pd.DataFrame) -> pd.DataFrame:
+    """Achata as respostas de deputados/{id} (ultimoStatus e gabinete aninhados) em colunas tipadas."""
+    if not validate_dataframe(details_df, "detalhes de deputados"):
+        return pd.DataFrame(columns=DEPUTY_DETAIL_COLUMNS)
+    
+    base = details_df.reindex(columns=DEPUTY_DETAIL_FIELDS)
+    status = details_df['ultimoStatus'] if 'ultimoStatus' in details_df.columns \
+        else pd.Series(None, index=details_df.index, dtype=object)
+    office = _unnest(status, {'gabinete': 'gabinete'})['gabinete']
+    social = details_df.get('redeSocial', pd.Series(None, index=details_df.index, dtype=object))
+    
+    result = pd.concat([base, _unnest(status, DEPUTY_STATUS_FIELDS), _unnest(office, DEPUTY_OFFICE_FIELDS)], axis=1)
+    result['redeSocial'] = social.where(social.map(type) == list).str.join(' ')
+    # Tipos do esquema: colunas sem nenhum valor no lote não viram float
+    return apply_schema(result, 'deputados', inplace=True)
+
+def compact_vote_details(df: pd.DataFrame) -> pd.DataFrame:
+    """Reduz a memória dos votos com os tipos do esquema (categorias e inteiros de 32 bits)."""
+    return apply_schema(df, 'votos', inplace=True)
+
 @dataclass
 class VoteAnalysis:
     total_votos: int
@@ -83,7 +177,7 @@ def process_votes_data(votes_df: pd.DataFrame, vote_details_df: pd.DataFrame) ->
         logger.error(f"Colunas necessárias ausentes: {required_cols}")
         return pd.DataFrame()
     
-    party_votes = vote_details_df.groupby(['siglaPartido', 'voto']).size().unstack(fill_value=0)
+    party_votes = vote_details_df.groupby(['siglaPartido', 'voto'], observed=True).size().unstack(fill_value=0)
     party_totals = party_votes.sum(axis=1)
     party_cohesion = party_votes.max(axis=1) / party_totals * 100
     
@@ -92,29 +186,38 @@ def process_votes_data(votes_df: pd.DataFrame, vote_details_df: pd.DataFrame) ->
         'coesao_percentual': party_cohesion
     })
 
-def create_analytical_view(deputies_df: pd.DataFrame, propositions_df: pd.DataFrame, 
+def create_analytical_view(deputies_table: pd.DataFrame, propositions_table: pd.DataFrame,
                          votes_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Resumo do dashboard a partir dos agregados materializados (utils.agregados).
+
+    deputies_table e propositions_table são as tabelas de deputados_partido_uf
+    e proposicoes_tipo_mes (dimensões e coluna total).
+    """
     if not all(validate_dataframe(df, name) for df, name in [
-        (deputies_df, "deputados"), 
-        (propositions_df, "proposições")
+        (deputies_table, "agregado de deputados"), 
+        (propositions_table, "agregado de proposições")
     ]):
         return pd.DataFrame()
     
     required_cols = {
-        'deputies': ['siglaPartido'],
-        'propositions': ['autor']
+        'deputies': ['siglaPartido', 'siglaUf', 'total'],
+        'propositions': ['siglaTipo', 'total']
     }
     
-    if not all(col in deputies_df.columns for col in required_cols['deputies']):
-        logger.error(f"Colunas necessárias ausentes em deputies_df: {required_cols['deputies']}")
+    if not all(col in deputies_table.columns for col in required_cols['deputies']):
+        logger.error(f"Colunas necessárias ausentes em deputies_table: {required_cols['deputies']}")
         return pd.DataFrame()
         
-    if not all(col in propositions_df.columns for col in required_cols['propositions']):
-        logger.error(f"Colunas necessárias ausentes em propositions_df: {required_cols['propositions']}")
+    if not all(col in propositions_table.columns for col in required_cols['propositions']):
+        logger.error(f"Colunas necessárias ausentes em propositions_table: {required_cols['propositions']}")
         return pd.DataFrame()
     
     return pd.DataFrame({
         'data_processamento': datetime.now(),
-        'total_deputados': len(deputies_df),
-        'total_proposicoes': len(propositions_df)
+        'total_deputados': int(deputies_table['total'].sum()),
+        'total_partidos': deputies_table['siglaPartido'].nunique(),
+        'total_ufs': deputies_table['siglaUf'].nunique(),
+        'total_proposicoes': int(propositions_table['total'].sum()),
+        'total_tipos_proposicao': propositions_table['siglaTipo'].nunique(),
+        'total_votacoes': len(votes_df) if votes_df is not None else 0
     }, index=[0])
\ No newline at end of file